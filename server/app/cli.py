@@ -0,0 +1,284 @@
+"""Offline batch extraction for backfills.
+
+Usage (from ``server/``)::
+
+    python -m app.cli extract /archive/loss-runs --output results.ndjson
+    python -m app.cli extract /archive/loss-runs --mongo --workers 8
+
+Runs the same pipeline as ``POST /extract`` over every supported file under a
+directory, one file per worker process, without the HTTP server. Results go to
+an NDJSON file (one extraction document per line) and/or are bulk-written to
+the ``files``/``extractions`` collections in batches. Mongo is only used with
+``--mongo`` and Ollama only with ``--llm``.
+
+Finished paths are appended to the checkpoint file once their result is
+written, so an interrupted run picks up where it stopped when started again
+with the same checkpoint.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, TextIO, Tuple
+from uuid import NAMESPACE_URL, uuid5
+from app.config import get_settings
+
+SUPPORTED_EXT = {".pdf", ".xls", ".xlsx", ".csv"}
+DEFAULT_CHECKPOINT = "extract.checkpoint"
+
+
+# One loop per worker process: the Motor client used for templates stays bound to the loop it started on
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _init_worker(overrides: Dict[str, Any]) -> None:
+    global _loop
+    settings = get_settings()
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+    _loop = asyncio.new_event_loop()
+
+
+def _extract_file(path: str, file_id: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Returns the extraction document and the stats that go on the ``files`` record."""
+    # Imported in the worker so the parent process never loads the OCR/PDF stack
+    from app.schemas.extraction import ExtractionRecord
+    from app.services.extractor import extract_local, file_summary
+
+    payload = _loop.run_until_complete(extract_local(path, file_id))
+    return payload, file_summary({field: payload.get(field, "") for field in ExtractionRecord.model_fields})
+
+
+def _file_id(path: Path) -> str:
+    # Stable per path, so a re-run updates the same records instead of duplicating them
+    return str(uuid5(NAMESPACE_URL, path.resolve().as_uri()))
+
+
+def _discover(root: Path) -> Iterator[Path]:
+    for path in sorted(root.rglob("*")):
+        if path.is_file() and path.suffix.lower() in SUPPORTED_EXT:
+            yield path
+
+
+def _load_checkpoint(path: Path) -> Set[str]:
+    if not path.exists():
+        return set()
+    with path.open(encoding="utf-8") as handle:
+        return {line.rstrip("\n") for line in handle if line.strip()}
+
+
+class _MongoWriter:
+    """Buffers results and writes them with one bulk upsert per collection."""
+
+    def __init__(self, batch_size: int):
+        from pymongo import MongoClient
+
+        settings = get_settings()
+        self.db = MongoClient(settings.mongo_uri)[settings.mongo_db]
+        self.batch_size = batch_size
+        self.pending: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
+
+    def add(self, doc: Dict[str, Any], summary: Dict[str, Any]) -> bool:
+        """Queue ``doc``; returns True when the batch was flushed."""
+        self.pending.append((doc, summary))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+            return True
+        return False
+
+    def flush(self) -> None:
+        from pymongo import UpdateOne
+
+        if not self.pending:
+            return
+        now = datetime.utcnow()
+        files = []
+        extractions = []
+        for doc, summary in self.pending:
+            payload = {key: value for key, value in doc.items() if key not in {"path", "filename"}}
+            file_doc = {
+                "fileId": doc["fileId"],
+                "filename": doc["filename"],
+                "path": doc["path"],
+                "status": "extracted",
+                "documentType": doc["documentType"],
+                "extractedAt": doc["extractedAt"],
+                "partial": doc["partial"],
+                **summary,
+            }
+            files.append(
+                UpdateOne({"fileId": doc["fileId"]}, {"$set": file_doc, "$setOnInsert": {"uploadedAt": now}}, upsert=True)
+            )
+            extractions.append(UpdateOne({"fileId": doc["fileId"]}, {"$set": payload}, upsert=True))
+        self.db.extractions.bulk_write(extractions, ordered=False)
+        self.db.files.bulk_write(files, ordered=False)
+        self.pending = []
+
+
+class _Summary:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.files = 0
+        self.failed = 0
+        self.skipped = 0
+        self.bytes = 0
+        self.pages = 0
+        self.by_type: Dict[str, int] = {}
+
+    def add(self, doc: Dict[str, Any], size: int) -> None:
+        self.files += 1
+        self.bytes += size
+        self.pages += doc.get("timings", {}).get("counts", {}).get("pages", 0)
+        doc_type = doc.get("documentType", "unknown")
+        self.by_type[doc_type] = self.by_type.get(doc_type, 0) + 1
+
+    def report(self, out: TextIO) -> None:
+        elapsed = time.perf_counter() - self.start
+        rate = self.files / elapsed if elapsed else 0.0
+        types = ", ".join(f"{name}={count}" for name, count in sorted(self.by_type.items())) or "none"
+        print(
+            f"extracted {self.files} files ({types}), {self.failed} failed, {self.skipped} already done\n"
+            f"{self.pages} pages, {self.bytes / 1e6:.1f} MB in {elapsed:.1f}s: "
+            f"{rate:.2f} files/s, {self.pages / elapsed if elapsed else 0.0:.1f} pages/s, "
+            f"{self.bytes / 1e6 / elapsed if elapsed else 0.0:.2f} MB/s",
+            file=out,
+        )
+
+
+def extract(args: argparse.Namespace) -> int:
+    root = Path(args.directory)
+    if not root.is_dir():
+        print(f"{root} is not a directory", file=sys.stderr)
+        return 2
+    if not args.output and not args.mongo:
+        print("Nothing to write: pass --output and/or --mongo", file=sys.stderr)
+        return 2
+
+    checkpoint_path = Path(args.checkpoint)
+    done = _load_checkpoint(checkpoint_path)
+    summary = _Summary()
+    files: List[Path] = []
+    for path in _discover(root):
+        if str(path.resolve()) in done:
+            summary.skipped += 1
+        else:
+            files.append(path)
+
+    overrides = {
+        "llm_enabled": args.llm,
+        # Templates live in Mongo; one process per file already uses every core, so no nested PDF pool
+        "templates_enabled": args.mongo and get_settings().templates_enabled,
+        "pdf_workers": 1,
+    }
+    output: Optional[TextIO] = open(args.output, "a", encoding="utf-8") if args.output else None
+    checkpoint = checkpoint_path.open("a", encoding="utf-8")
+    mongo = _MongoWriter(args.batch_size) if args.mongo else None
+    # With --mongo, results are only buffered until their batch lands; their NDJSON lines and
+    # checkpoint entries are written then too, so a resumed run never repeats a line
+    unflushed: List[str] = []
+    unwritten: List[str] = []
+    workers = args.workers or os.cpu_count() or 1
+
+    def write_lines(lines: List[str]) -> None:
+        if output is not None and lines:
+            output.writelines(lines)
+            output.flush()
+
+    def checkpoint_paths(paths: List[str]) -> None:
+        checkpoint.writelines(entry + "\n" for entry in paths)
+        checkpoint.flush()
+
+    def flushed() -> None:
+        write_lines(unwritten)
+        checkpoint_paths(unflushed)
+        unwritten.clear()
+        unflushed.clear()
+
+    def record(path: Path, result: Tuple[Dict[str, Any], Dict[str, Any]]) -> None:
+        payload, file_stats = result
+        doc = {"filename": path.name, "path": str(path.resolve()), **payload}
+        line = json.dumps(doc, default=str) + "\n"
+        summary.add(doc, path.stat().st_size)
+        if mongo is None:
+            write_lines([line])
+            checkpoint_paths([doc["path"]])
+            return
+        unwritten.append(line)
+        unflushed.append(doc["path"])
+        if mongo.add(doc, file_stats):
+            flushed()
+
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            # spawn, like pdf_service: forked copies of a threaded parent can deadlock
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(overrides,),
+        ) as pool:
+            queue = iter(files)
+            running: Dict[Future, Path] = {}
+            # Several futures can finish per wait(), so processed can jump past a multiple of progress_every
+            processed = last_reported = 0
+            while True:
+                # Keep a bounded window in flight so huge archives don't queue every future at once
+                for path in queue:
+                    running[pool.submit(_extract_file, str(path), _file_id(path))] = path
+                    if len(running) >= workers * 2:
+                        break
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    path = running.pop(future)
+                    try:
+                        record(path, future.result())
+                    except Exception as exc:
+                        summary.failed += 1
+                        print(f"failed: {path}: {exc}", file=sys.stderr)
+                processed = summary.files + summary.failed
+                if args.progress_every and processed - last_reported >= args.progress_every:
+                    print(f"{processed}/{len(files)} files", file=sys.stderr)
+                    last_reported = processed
+            if args.progress_every and processed != last_reported:
+                print(f"{processed}/{len(files)} files", file=sys.stderr)
+        if mongo is not None:
+            mongo.flush()
+            flushed()
+    finally:
+        checkpoint.close()
+        if output is not None:
+            output.close()
+
+    summary.report(sys.stdout)
+    return 1 if summary.failed else 0
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Offline extraction tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    extract_parser = commands.add_parser("extract", help="Extract every supported file under a directory")
+    extract_parser.add_argument("directory")
+    extract_parser.add_argument("--output", help="Append NDJSON results to this file")
+    extract_parser.add_argument("--mongo", action="store_true", help="Bulk-write results to MONGO_URI/MONGO_DB")
+    extract_parser.add_argument("--batch-size", type=int, default=200, help="Documents per Mongo bulk write")
+    extract_parser.add_argument("--workers", type=int, help="Worker processes (default: one per CPU)")
+    extract_parser.add_argument(
+        "--checkpoint", default=DEFAULT_CHECKPOINT, help=f"Finished paths, for resuming (default {DEFAULT_CHECKPOINT})"
+    )
+    extract_parser.add_argument("--llm", action="store_true", help="Allow the Ollama fallback (off by default)")
+    extract_parser.add_argument("--progress-every", type=int, default=100, help="Report progress every N files (0: never)")
+
+    args = parser.parse_args(argv)
+    return extract(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
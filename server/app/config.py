@@ -7,7 +7,60 @@ class Settings(BaseModel):
   mongo_uri: str = os.getenv('MONGO_URI', 'mongodb://localhost:27017/document_extractor')
   mongo_db: str = os.getenv('MONGO_DB', 'document_extractor')
   uploads_dir: str = os.getenv('UPLOADS_DIR', 'uploads')
+  # Resumable uploads (/upload/sessions): total size cap, per-PUT chunk cap, idle time before the sweeper drops a session
+  upload_max_mb: int = int(os.getenv('UPLOAD_MAX_MB', '500'))
+  upload_chunk_max_mb: int = int(os.getenv('UPLOAD_CHUNK_MAX_MB', '32'))
+  upload_session_ttl_seconds: float = float(os.getenv('UPLOAD_SESSION_TTL_SECONDS', '86400'))
+  upload_sweep_seconds: float = float(os.getenv('UPLOAD_SWEEP_SECONDS', '600'))
   ollama_url: str = os.getenv('OLLAMA_URL', 'http://localhost:11434')
+  # false skips the Ollama fallback entirely (rule, table and template results only)
+  llm_enabled: bool = os.getenv('LLM_ENABLED', 'true').lower() == 'true'
+  analytics_dir: str = os.getenv('ANALYTICS_DIR', 'analytics')
+  # Snapshots re-read this far behind the watermark to catch rows whose write landed late
+  analytics_overlap_seconds: float = float(os.getenv('ANALYTICS_OVERLAP_SECONDS', '600'))
+  admin_token: str = os.getenv('ADMIN_TOKEN', '')
+  # off: never profile, header: admins opt in with X-Profile, always: also profile every extraction job
+  profiling_mode: str = os.getenv('PROFILING_MODE', 'header')
+  profile_top_n: int = int(os.getenv('PROFILE_TOP_N', '40'))
+  # PDFs with at least this many pages are parsed in worker processes; 0 workers means one per CPU
+  pdf_parallel_min_pages: int = int(os.getenv('PDF_PARALLEL_MIN_PAGES', '50'))
+  pdf_workers: int = int(os.getenv('PDF_WORKERS', '0'))
+  # Multi-sheet workbooks with at least this many cells build sheets in worker processes (PDF_WORKERS of them)
+  table_parallel_min_cells: int = int(os.getenv('TABLE_PARALLEL_MIN_CELLS', '50000'))
+  # Detect ruled tables on PDF pages and map their columns like spreadsheet headers
+  pdf_tables: bool = os.getenv('PDF_TABLES', 'true').lower() == 'true'
+  # full: parse every page; streaming: stop once stream_coverage_fields reach the threshold
+  extraction_mode: str = os.getenv('EXTRACTION_MODE', 'full')
+  stream_coverage_fields: list[str] = [
+    field.strip()
+    for field in os.getenv('STREAM_COVERAGE_FIELDS', 'policyNumber,claimNumber,insured,carrier,dateOfLoss').split(',')
+    if field.strip()
+  ]
+  stream_coverage_threshold: float = float(os.getenv('STREAM_COVERAGE_THRESHOLD', '1.0'))
+  prerender_enabled: bool = os.getenv('PRERENDER_ENABLED', 'true').lower() == 'true'
+  prerender_workers: int = int(os.getenv('PRERENDER_WORKERS', '1'))
+  prerender_first_pages: int = int(os.getenv('PRERENDER_FIRST_PAGES', '3'))
+  thumbnail_scale: float = float(os.getenv('THUMBNAIL_SCALE', '0.3'))
+  # Durable extraction queue (python -m app.workers); leases are renewed every third of job_lease_seconds
+  job_lease_seconds: float = float(os.getenv('JOB_LEASE_SECONDS', '120'))
+  job_max_attempts: int = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+  job_backoff_seconds: float = float(os.getenv('JOB_BACKOFF_SECONDS', '10'))
+  worker_concurrency: int = int(os.getenv('WORKER_CONCURRENCY', '1'))
+  worker_poll_seconds: float = float(os.getenv('WORKER_POLL_SECONDS', '2'))
+  # An 'extracting' lock older than this is assumed abandoned by a crashed process
+  extraction_lock_seconds: float = float(os.getenv('EXTRACTION_LOCK_SECONDS', '1800'))
+  # Time budget per extraction (0 disables); stages that don't fit are skipped and finished by a queued job
+  extraction_deadline_seconds: float = float(os.getenv('EXTRACTION_DEADLINE_SECONDS', '300'))
+  # Layout templates: a learned field region is trusted once it reproduced the extracted value this many times
+  templates_enabled: bool = os.getenv('TEMPLATES_ENABLED', 'true').lower() == 'true'
+  template_min_confirmations: int = int(os.getenv('TEMPLATE_MIN_CONFIRMATIONS', '2'))
+  # Admission control: concurrent slots per stage; extraction requests beyond the queue size get 503
+  extraction_concurrency: int = int(os.getenv('EXTRACTION_CONCURRENCY', '4'))
+  extraction_queue_size: int = int(os.getenv('EXTRACTION_QUEUE_SIZE', '16'))
+  ocr_concurrency: int = int(os.getenv('OCR_CONCURRENCY', '1'))
+  llm_concurrency: int = int(os.getenv('LLM_CONCURRENCY', '2'))
+  # Responses at least this large are gzipped for clients that accept it (page images and event streams never are)
+  gzip_min_bytes: int = int(os.getenv('GZIP_MIN_BYTES', '1024'))
 
 
 @lru_cache
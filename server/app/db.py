@@ -16,3 +16,25 @@ def get_db() -> AsyncIOMotorDatabase:
     settings = get_settings()
     return get_client()[settings.mongo_db]
 
+
+async def ensure_indexes() -> None:
+    """Create the indexes the API and workers rely on; safe to run on every start."""
+    from app.services import upload_sessions
+    from app.workers.mongo_queue import get_job_queue
+
+    await get_db().files.create_index("fileId")
+    # GET /files: equality filters first, then the keyset sort, so each filter combination is one index range
+    for filters in ([], ["status"], ["documentType"], ["status", "documentType"]):
+        await get_db().files.create_index([*((name, 1) for name in filters), ("uploadedAt", -1), ("fileId", -1)])
+    await get_db().templates.create_index("templateId", unique=True)
+    # One template per exact fingerprint; templates created before the key existed don't have one
+    await get_db().templates.create_index(
+        "layout", unique=True, partialFilterExpression={"layout": {"$exists": True}}
+    )
+    # GET /search: one text index per collection, key fields weighted above the body text
+    weights = {"policyNumber": 10, "claimNumber": 10, "insured": 5, "carrier": 5, "normalizedText": 1}
+    await get_db().extractions.create_index(
+        [(field, "text") for field in weights], name="extraction_search", weights=weights
+    )
+    await get_job_queue().ensure_indexes()
+    await upload_sessions.ensure_indexes()
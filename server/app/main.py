@@ -1,8 +1,43 @@
-from fastapi import FastAPI
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import upload, extract, documents, export
+from fastapi.middleware.gzip import GZipMiddleware
+from app.routers import upload, extract, documents, export, admin, files, search, metrics as metrics_router
+from app.config import get_settings
+from app.db import ensure_indexes
+from app.services import capacity, excel_service, metrics, pdf_service, prerender, profiling, upload_sessions
 
-app = FastAPI(title="Document Extractor API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await ensure_indexes()
+    stop = asyncio.Event()
+    sweeper = asyncio.create_task(upload_sessions.run_sweeper(stop))
+    yield
+    stop.set()
+    await sweeper
+    # Pool shutdown blocks until running work finishes; keep it off the event loop
+    await asyncio.to_thread(prerender.shutdown)
+    await asyncio.to_thread(pdf_service.shutdown)
+    await asyncio.to_thread(excel_service.shutdown)
+
+
+class JSONGZipMiddleware(GZipMiddleware):
+    """GZip large responses, except page images (already PNG) and SSE streams, which gzip would hold back."""
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and (scope["path"].startswith("/page/") or scope["path"].endswith("/events")):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+app = FastAPI(title="Document Extractor API", lifespan=lifespan)
+
+app.add_middleware(JSONGZipMiddleware, minimum_size=get_settings().gzip_min_bytes, compresslevel=5)
 
 app.add_middleware(
     CORSMiddleware,
@@ -15,7 +50,46 @@ app.add_middleware(
 app.include_router(upload.router)
 app.include_router(extract.router)
 app.include_router(documents.router)
+app.include_router(files.router)
+app.include_router(search.router)
 app.include_router(export.router)
+app.include_router(metrics_router.router)
+app.include_router(admin.router)
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Use the route template so /page/{file_id}/{page} stays one series
+        route = request.scope.get("route")
+        metrics.HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=str(status),
+        )
+
+
+@app.middleware("http")
+async def profile_requests(request: Request, call_next):
+    if profiling.wants_profile(request):
+        return await profiling.profile_request(request, call_next)
+    return await call_next(request)
+
+
+@app.exception_handler(capacity.CapacityExceeded)
+async def capacity_exceeded(request: Request, exc: capacity.CapacityExceeded):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc), "stage": exc.stage},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
 
 
 @app.get("/health")
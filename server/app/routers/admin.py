@@ -0,0 +1,16 @@
+import asyncio
+from fastapi import APIRouter, Depends, Query
+from app.services import profiling
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(profiling.require_admin)])
+
+
+@router.post("/profile/sample")
+async def sample_profile(
+    seconds: float = Query(10.0, gt=0, le=120),
+    interval: float = Query(0.005, ge=0.001, le=1.0),
+):
+    # Sampling runs in a worker thread so the event loop (and its extractions) keeps running
+    result = await asyncio.to_thread(profiling.sample_stacks, seconds, interval)
+    path = profiling.write_samples(result)
+    return {"samples": result["samples"], "path": str(path), "top": result["top"]}
@@ -1,12 +1,17 @@
-from fastapi import APIRouter, HTTPException
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import StreamingResponse
 from io import BytesIO
 from app.db import get_db
-from app.schemas.extraction import EditPayload, ExtractionRecord
-from app.services import storage, citation
+from app.schemas.extraction import BatchEditPayload, EditPayload, ExtractionRecord
+from app.services import storage, citation, extractor, profiling, templates
+from app.utils.shaping import Shape, shape_params, shaped
 
 router = APIRouter(tags=["documents"])
 FIELD_NAMES = list(ExtractionRecord.model_fields.keys())
+EDITABLE_FIELDS = set(FIELD_NAMES) - {"fileId"}
+# Everything the edit response needs, without normalizedText, timings or other heavy extras
+EDIT_PROJECTION = {"_id": 0, "textBlocks": 1, "citations": 1, "templateId": 1, **{field: 1 for field in FIELD_NAMES}}
 
 
 def _record_data(doc: dict) -> dict:
@@ -14,28 +19,73 @@ def _record_data(doc: dict) -> dict:
 
 
 @router.get("/extracted/{file_id}")
-async def get_extracted(file_id: str):
+async def get_extracted(file_id: str, shape: Shape = Depends(shape_params)):
     db = get_db()
-    doc = await db.extractions.find_one({"fileId": file_id}, {"_id": 0})
+    doc = await db.extractions.find_one({"fileId": file_id}, shape.projection())
     if not doc:
         raise HTTPException(status_code=404, detail="Extraction not found")
-    record = ExtractionRecord(**_record_data(doc))
-    return {"data": record.model_dump(), "citations": doc.get("citations", [])}
+    return shaped(doc, doc.get("citations"), shape)
 
 
-@router.get("/page/{file_id}/{page}")
-async def get_page(file_id: str, page: int):
+# Rendered regions never change for a given upload, so browsers may cache them
+IMAGE_CACHE_HEADERS = {"Cache-Control": "private, max-age=86400"}
+
+
+async def _pdf_file(file_id: str) -> dict:
     db = get_db()
     file_doc = await db.files.find_one({"fileId": file_id})
     if not file_doc:
         raise HTTPException(status_code=404, detail="File not found")
     if not file_doc["filename"].lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Page preview only available for PDF files")
+    return file_doc
+
 
+@router.get("/page/{file_id}/{page}")
+async def get_page(file_id: str, page: int):
+    file_doc = await _pdf_file(file_id)
     image_bytes = await storage.render_page_image(file_doc["path"], page)
     return StreamingResponse(BytesIO(image_bytes), media_type="image/png")
 
 
+@router.get("/page/{file_id}/{page}/thumbnail")
+async def get_page_thumbnail(file_id: str, page: int):
+    file_doc = await _pdf_file(file_id)
+    image_bytes = await storage.render_thumbnail(file_doc["path"], page)
+    return StreamingResponse(BytesIO(image_bytes), media_type="image/png", headers=IMAGE_CACHE_HEADERS)
+
+
+@router.get("/page/{file_id}/{page}/clip")
+async def get_page_clip(
+    file_id: str,
+    page: int,
+    x: float,
+    y: float,
+    width: float = Query(..., gt=0),
+    height: float = Query(..., gt=0),
+    scale: float = Query(2.0, gt=0, le=storage.MAX_CLIP_SCALE),
+    padding: float = Query(0.0, ge=0),
+):
+    """Render just a citation's ``bounds`` (plus optional padding in points) instead of the whole page."""
+    file_doc = await _pdf_file(file_id)
+    bounds = {"x": x, "y": y, "width": width, "height": height}
+    image_bytes = await storage.render_clip(file_doc["path"], page, bounds, scale, padding)
+    return StreamingResponse(BytesIO(image_bytes), media_type="image/png", headers=IMAGE_CACHE_HEADERS)
+
+
+@router.get("/page/{file_id}/{page}/tiles")
+async def get_tile_grid(file_id: str, page: int):
+    file_doc = await _pdf_file(file_id)
+    return storage.tile_grid(file_doc["path"], page)
+
+
+@router.get("/page/{file_id}/{page}/tiles/{z}/{x}/{y}")
+async def get_page_tile(file_id: str, page: int, z: int, x: int, y: int):
+    file_doc = await _pdf_file(file_id)
+    image_bytes = await storage.render_tile(file_doc["path"], page, z, x, y)
+    return StreamingResponse(BytesIO(image_bytes), media_type="image/png", headers=IMAGE_CACHE_HEADERS)
+
+
 @router.get("/page-count/{file_id}")
 async def get_page_count(file_id: str):
     db = get_db()
@@ -43,7 +93,10 @@ async def get_page_count(file_id: str):
     if not file_doc:
         raise HTTPException(status_code=404, detail="File not found")
     if not file_doc["filename"].lower().endswith(".pdf"):
-        return {"pageCount": 1}  # Non-PDF files are treated as single page
+        # Workbooks have one "page" per sheet; other non-PDF files are treated as single page
+        extraction = await db.extractions.find_one({"fileId": file_id}, {"_id": 0, "sheetNames": 1})
+        sheet_names = (extraction or {}).get("sheetNames") or []
+        return {"pageCount": max(1, len(sheet_names)), "sheetNames": sheet_names}
     
     import fitz
     try:
@@ -56,7 +109,8 @@ async def get_page_count(file_id: str):
 
 
 @router.post("/edit")
-async def save_edit(payload: EditPayload):
+async def save_edit(payload: EditPayload, shape: Shape = Depends(shape_params)):
+    profiling.bind_file(payload.fileId)
     db = get_db()
     doc = await db.extractions.find_one({"fileId": payload.fileId})
     if not doc:
@@ -66,9 +120,39 @@ async def save_edit(payload: EditPayload):
     citations = citation.update_single_field(payload.field, payload.value, text_blocks, doc.get("citations", []))
     await db.extractions.update_one(
         {"fileId": payload.fileId},
-        {"$set": {payload.field: payload.value, "citations": citations}},
+        # extractedAt marks the last change, so the next analytics snapshot picks up the correction
+        {"$set": {payload.field: payload.value, "citations": citations, "extractedAt": datetime.utcnow()}},
     )
+    if doc.get("templateId"):
+        await templates.learn_edits(
+            doc["templateId"], {payload.field: payload.value}, citations, extractor.clean_field_value
+        )
     record_dict = _record_data({**doc, payload.field: payload.value})
-    updated = ExtractionRecord(**record_dict)
-    return {"data": updated.model_dump(), "citations": citations}
+    await db.files.update_one({"fileId": payload.fileId}, {"$set": extractor.file_summary(record_dict)})
+    return shaped(record_dict, citations, shape)
+
+
+@router.post("/edit/batch")
+async def save_batch_edit(payload: BatchEditPayload, shape: Shape = Depends(shape_params)):
+    unknown = sorted({edit.field for edit in payload.edits} - EDITABLE_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+
+    profiling.bind_file(payload.fileId)
+    db = get_db()
+    doc = await db.extractions.find_one({"fileId": payload.fileId}, EDIT_PROJECTION)
+    if not doc:
+        raise HTTPException(status_code=404, detail="Extraction not found")
 
+    # Later edits of the same field win, as they would with sequential /edit calls
+    values = {edit.field: edit.value for edit in payload.edits}
+    citations = citation.update_fields(values, doc.get("textBlocks", []), doc.get("citations", []))
+    await db.extractions.update_one(
+        {"fileId": payload.fileId},
+        {"$set": {**values, "citations": citations, "extractedAt": datetime.utcnow()}},
+    )
+    if doc.get("templateId"):
+        await templates.learn_edits(doc["templateId"], values, citations, extractor.clean_field_value)
+    record_dict = _record_data({**doc, **values})
+    await db.files.update_one({"fileId": payload.fileId}, {"$set": extractor.file_summary(record_dict)})
+    return shaped(record_dict, citations, shape)
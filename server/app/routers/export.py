@@ -1,26 +1,38 @@
 from io import BytesIO
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 import pandas as pd
 from app.db import get_db
 from app.schemas.extraction import ExtractionRecord
+from app.services import analytics
+from app.utils.shaping import Shape, shape_params, shaped
 
 router = APIRouter(tags=["export"])
 
 
+@router.post("/export/parquet")
+async def export_parquet_snapshot():
+    try:
+        return await analytics.append_snapshot()
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"Parquet snapshot failed: {exc}") from exc
+
+
 @router.get("/export/{file_id}")
-async def export_file(file_id: str, format: str = "json"):
+async def export_file(file_id: str, format: str = "json", shape: Shape = Depends(shape_params)):
     db = get_db()
-    doc = await db.extractions.find_one({"fileId": file_id}, {"_id": 0})
+    # The shaping options apply to the JSON body; spreadsheets keep one column per record field
+    projection = shape.projection() if format == "json" else {"_id": 0, **{field: 1 for field in ExtractionRecord.model_fields}}
+    doc = await db.extractions.find_one({"fileId": file_id}, projection)
     if not doc:
         raise HTTPException(status_code=404, detail="Extraction not found")
 
-    record_input = {field: doc.get(field, "") for field in ExtractionRecord.model_fields.keys()}
-    payload = ExtractionRecord(**record_input).model_dump()
     if format == "json":
-        return JSONResponse({"data": payload, "citations": doc.get("citations", [])})
+        return shaped(doc, doc.get("citations"), shape)
 
     if format in {"xlsx", "xls"}:
+        record_input = {field: doc.get(field, "") for field in ExtractionRecord.model_fields.keys()}
+        payload = ExtractionRecord(**record_input).model_dump()
         df = pd.DataFrame([payload])
         buffer = BytesIO()
         df.to_excel(buffer, index=False)
@@ -1,32 +1,111 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from app.db import get_db
-from app.services import extractor
-import traceback
+from app.services import capacity, extractor, profiling, progress, singleflight
+from app.services.deadline import Deadline
+from app.utils.shaping import Shape, shape_params, shaped
+from app.workers.mongo_queue import get_job_queue
+import asyncio
+import json
 
 router = APIRouter(tags=["extract"])
 
 
 class ExtractPayload(BaseModel):
     fileId: str
+    # Re-run even if a stored result exists
+    force: bool = False
+    # Overrides EXTRACTION_DEADLINE_SECONDS for this request or job
+    deadlineSeconds: Optional[float] = Field(None, gt=0)
+
+
+class PendingPagesPayload(BaseModel):
+    pages: Optional[List[int]] = None
 
 
 @router.post("/extract")
-async def start_extraction(payload: ExtractPayload):
+async def start_extraction(payload: ExtractPayload, shape: Shape = Depends(shape_params)):
+    profiling.bind_file(payload.fileId)
     db = get_db()
     file_doc = await db.files.find_one({"fileId": payload.fileId})
     if not file_doc:
         raise HTTPException(status_code=404, detail="File not found")
 
-    await db.files.update_one({"fileId": payload.fileId}, {"$set": {"status": "extracting"}})
+    # Callers joining an extraction already running for this file wait on it without taking a slot
     try:
-        record, citations = await extractor.run_extraction(file_doc)
-    except Exception as exc:
-        await db.files.update_one(
-            {"fileId": payload.fileId},
-            {"$set": {"status": "failed", "error": str(exc), "traceback": traceback.format_exc()}},
+        deadline = Deadline.from_settings(payload.deadlineSeconds)
+        record, citations = await singleflight.extract(
+            file_doc, force=payload.force, deadline=deadline, limiter=capacity.extraction
         )
+    except capacity.CapacityExceeded:
+        raise
+    except LookupError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    except Exception as exc:
         raise HTTPException(status_code=500, detail=f"Extraction failed: {exc}") from exc
 
-    return {"data": record, "citations": citations}
+    return shaped(record, citations, shape)
+
+
+@router.post("/extract/jobs", status_code=202)
+async def enqueue_extraction(payload: ExtractPayload):
+    db = get_db()
+    file_doc = await db.files.find_one({"fileId": payload.fileId}, {"_id": 1})
+    if not file_doc:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    job = await get_job_queue().enqueue(
+        payload.fileId, payload={"force": payload.force, "deadlineSeconds": payload.deadlineSeconds}
+    )
+    # Leave an in-flight lock or (unless forced) a stored result alone; the job joins or returns it
+    busy = ["extracting"] if payload.force else ["extracting", "extracted"]
+    await db.files.update_one({"fileId": payload.fileId, "status": {"$nin": busy}}, {"$set": {"status": "queued"}})
+    await db.files.update_one({"fileId": payload.fileId}, {"$set": {"jobId": job["jobId"]}})
+    return {"jobId": job["jobId"], "fileId": payload.fileId, "status": job["status"]}
+
+
+@router.get("/extract/jobs/{job_id}")
+async def get_extraction_job(job_id: str):
+    job = await get_job_queue().get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("/extract/{file_id}/pages")
+async def fill_pending_pages(file_id: str, payload: PendingPagesPayload | None = None):
+    try:
+        async with capacity.extraction.slot():
+            record, citations, pending = await extractor.fill_pending_pages(file_id, payload.pages if payload else None)
+    except LookupError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    return {"data": record, "citations": citations, "pendingPages": pending}
+
+
+@router.get("/extract/{file_id}/events")
+async def stream_extraction_events(file_id: str, request: Request):
+    queue = progress.broker.subscribe(file_id)
+
+    async def event_stream():
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {event['stage']}\ndata: {json.dumps(event)}\n\n"
+                if event["stage"] in progress.TERMINAL_STAGES:
+                    break
+        finally:
+            progress.broker.unsubscribe(file_id, queue)
 
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
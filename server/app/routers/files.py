@@ -0,0 +1,83 @@
+from datetime import datetime
+from typing import List, Literal, Optional
+from fastapi import APIRouter, HTTPException, Query
+from app.db import get_db
+from app.utils import cursor as cursor_token
+
+router = APIRouter(tags=["files"])
+
+LIST_PROJECTION = {
+    "_id": 0,
+    "fileId": 1,
+    "filename": 1,
+    "status": 1,
+    "uploadedAt": 1,
+    "documentType": 1,
+    "coverage": 1,
+    "fieldsFound": 1,
+    "partial": 1,
+    "extractedAt": 1,
+    "error": 1,
+}
+
+
+def _encode_cursor(doc: dict) -> str:
+    return cursor_token.encode({"u": doc["uploadedAt"].isoformat(), "f": doc["fileId"]})
+
+
+def _decode_cursor(cursor: str) -> tuple:
+    position = cursor_token.decode(cursor)
+    try:
+        return datetime.fromisoformat(position["u"]), str(position["f"])
+    except (ValueError, KeyError, TypeError) as exc:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from exc
+
+
+@router.get("/files")
+async def list_files(
+    status: Optional[List[str]] = Query(None),
+    documentType: Optional[List[str]] = Query(None),
+    uploadedAfter: Optional[datetime] = None,
+    uploadedBefore: Optional[datetime] = None,
+    order: Literal["desc", "asc"] = "desc",
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+):
+    """List uploaded files by ``uploadedAt`` (then fileId), one keyset page at a time.
+
+    Pass the returned ``nextCursor`` back as ``cursor`` with the same filters to
+    get the next page; each page is an index range scan, however deep it is.
+    """
+    query: dict = {}
+    if status:
+        query["status"] = status[0] if len(status) == 1 else {"$in": status}
+    if documentType:
+        query["documentType"] = documentType[0] if len(documentType) == 1 else {"$in": documentType}
+    uploaded: dict = {}
+    if uploadedAfter:
+        uploaded["$gte"] = uploadedAfter
+    if uploadedBefore:
+        uploaded["$lt"] = uploadedBefore
+    if uploaded:
+        query["uploadedAt"] = uploaded
+
+    direction = -1 if order == "desc" else 1
+    if cursor:
+        uploaded_at, file_id = _decode_cursor(cursor)
+        past = "$lt" if direction == -1 else "$gt"
+        query["$or"] = [
+            {"uploadedAt": {past: uploaded_at}},
+            {"uploadedAt": uploaded_at, "fileId": {past: file_id}},
+        ]
+
+    # One extra row tells whether there is a next page without a count query
+    docs = (
+        await get_db()
+        .files.find(query, LIST_PROJECTION)
+        .sort([("uploadedAt", direction), ("fileId", direction)])
+        .limit(limit + 1)
+        .to_list(limit + 1)
+    )
+    items = docs[:limit]
+    next_cursor = _encode_cursor(items[-1]) if len(docs) > limit else None
+    return {"items": items, "nextCursor": next_cursor}
@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+from app.services import capacity, metrics
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics")
+async def get_metrics():
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@router.get("/status/capacity")
+async def get_capacity():
+    return {"stages": capacity.snapshot()}
@@ -0,0 +1,128 @@
+import re
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query
+from app.db import get_db
+from app.utils import cursor as cursor_token
+
+router = APIRouter(tags=["search"])
+
+MAX_BLOCK_MATCHES = 5
+
+
+# Longest first; stripping them leaves a prefix that also starts the other inflections $text matches
+SUFFIXES = ("ying", "ies", "ied", "ing", "es", "ed", "ly", "s", "y", "e")
+MIN_STEM = 3
+
+
+def _stem(word: str) -> str:
+    word = word.lower()
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM:
+            word = word[: -len(suffix)]
+            break
+    # "running" -> "runn" -> "run"
+    if len(word) > MIN_STEM and word[-1] == word[-2] and word[-1] not in "aeiou":
+        word = word[:-1]
+    return word
+
+
+def _block_pattern(q: str) -> str:
+    """Regex for the blocks worth showing for ``q``.
+
+    $text matches stemmed words ("claims" finds "claim"), so single words match
+    any word starting with their crude stem; quoted phrases match literally, as
+    they do in $text. "-word" excludes and never matches a block. The stemming
+    is approximate, so a hit can still come back with fewer (or no) block matches.
+    """
+    phrases = [phrase for phrase in re.findall(r'"([^"]+)"', q) if phrase.strip()]
+    words = [word for word in re.sub(r'"[^"]*"', " ", q).split() if not word.startswith("-")]
+    parts = [re.escape(phrase) for phrase in phrases]
+    parts += [r"\b" + re.escape(_stem(stripped)) for stripped in (word.strip(".,;:!?()") for word in words) if stripped]
+    return "|".join(parts)
+
+
+def _position(cursor: str) -> tuple:
+    position = cursor_token.decode(cursor)
+    try:
+        return float(position["s"]), str(position["f"])
+    except (ValueError, KeyError, TypeError) as exc:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from exc
+
+
+@router.get("/search")
+async def search(
+    q: str = Query(..., min_length=1),
+    documentType: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+):
+    """Rank extractions by text score over normalizedText and key fields.
+
+    Each hit carries up to MAX_BLOCK_MATCHES stored text blocks (page and
+    bounds) that match a search term (see _block_pattern); the filtering runs
+    inside the aggregation, so only the returned page's blocks leave Mongo.
+    """
+    pattern = _block_pattern(q)
+    if not pattern:
+        raise HTTPException(status_code=400, detail="Query has no search terms")
+
+    match: dict = {"$text": {"$search": q}}
+    if documentType:
+        match["documentType"] = documentType
+    pipeline: List[dict] = [{"$match": match}, {"$addFields": {"score": {"$meta": "textScore"}}}]
+    if cursor:
+        score, file_id = _position(cursor)
+        pipeline.append(
+            {"$match": {"$or": [{"score": {"$lt": score}}, {"score": score, "fileId": {"$gt": file_id}}]}}
+        )
+    pipeline += [
+        {"$sort": {"score": -1, "fileId": 1}},
+        # One extra row tells whether there is a next page
+        {"$limit": limit + 1},
+        {
+            "$project": {
+                "_id": 0,
+                "fileId": 1,
+                "score": 1,
+                "documentType": 1,
+                "policyNumber": 1,
+                "claimNumber": 1,
+                "insured": 1,
+                "carrier": 1,
+                "matches": {
+                    "$map": {
+                        "input": {
+                            "$slice": [
+                                {
+                                    "$filter": {
+                                        "input": {"$ifNull": ["$textBlocks", []]},
+                                        "as": "block",
+                                        "cond": {
+                                            "$regexMatch": {
+                                                "input": {"$ifNull": ["$$block.text", ""]},
+                                                "regex": pattern,
+                                                "options": "i",
+                                            }
+                                        },
+                                    }
+                                },
+                                MAX_BLOCK_MATCHES,
+                            ]
+                        },
+                        "as": "block",
+                        "in": {"page": "$$block.page", "bounds": "$$block.bounds", "text": "$$block.text"},
+                    }
+                },
+            }
+        },
+        {"$lookup": {"from": "files", "localField": "fileId", "foreignField": "fileId", "as": "file"}},
+        {"$addFields": {"filename": {"$arrayElemAt": ["$file.filename", 0]}}},
+        {"$project": {"file": 0}},
+    ]
+
+    docs = await get_db().extractions.aggregate(pipeline).to_list(limit + 1)
+    items = docs[:limit]
+    next_cursor = (
+        cursor_token.encode({"s": items[-1]["score"], "f": items[-1]["fileId"]}) if len(docs) > limit else None
+    )
+    return {"items": items, "nextCursor": next_cursor}
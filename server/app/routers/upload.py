@@ -1,39 +1,39 @@
 from datetime import datetime
-from fastapi import APIRouter, UploadFile, File, HTTPException, status
+import re
+from fastapi import APIRouter, Header, Request, Response, UploadFile, File, HTTPException, status
+from pydantic import BaseModel, Field
+from typing import Optional
 from uuid import uuid4
-from app.services import storage
+from app.services import prerender, storage, upload_sessions
 from app.db import get_db
 
 router = APIRouter(prefix="/upload", tags=["upload"])
 
 SUPPORTED_EXT = {"pdf", "xls", "xlsx", "csv"}
+CONTENT_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+)")
 
 
-@router.post("")
-async def upload_file(file: UploadFile = File(...)):
-    if not file.filename:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Filename missing")
+class UploadSessionPayload(BaseModel):
+    filename: str
+    size: int = Field(gt=0)
+    # Optional SHA-256 of the whole file, checked when the upload is finalized
+    sha256: Optional[str] = None
+
 
-    ext = file.filename.split(".")[-1].lower()
+def _check_extension(filename: str) -> None:
+    ext = filename.split(".")[-1].lower()
     if ext not in SUPPORTED_EXT:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unsupported file type")
 
-    file_id = str(uuid4())
-
-    try:
-        saved_path = await storage.save_file(file_id, file)
-    except HTTPException:
-        raise
-    except Exception as exc:
-        raise HTTPException(status_code=500, detail=f"Failed to store file: {exc}") from exc
 
+async def _register(file_id: str, filename: str, saved_path: str) -> dict:
     db = get_db()
     await db.files.update_one(
         {"fileId": file_id},
         {
             "$set": {
                 "fileId": file_id,
-                "filename": file.filename,
+                "filename": filename,
                 "path": saved_path,
                 "status": "uploaded",
                 "uploadedAt": datetime.utcnow(),
@@ -41,6 +41,72 @@ async def upload_file(file: UploadFile = File(...)):
         },
         upsert=True,
     )
+    prerender.schedule_after_upload(saved_path)
+    return {"fileId": file_id, "filename": filename, "status": "uploaded"}
+
+
+@router.post("")
+async def upload_file(file: UploadFile = File(...)):
+    if not file.filename:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Filename missing")
+
+    _check_extension(file.filename)
+
+    file_id = str(uuid4())
+
+    try:
+        saved_path = await storage.save_file(file_id, file)
+    except HTTPException:
+        raise
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"Failed to store file: {exc}") from exc
+
+    return await _register(file_id, file.filename, saved_path)
+
+
+@router.post("/sessions", status_code=status.HTTP_201_CREATED)
+async def create_upload_session(payload: UploadSessionPayload):
+    """Start a resumable upload; send the bytes with PUT /upload/sessions/{uploadId}."""
+    _check_extension(payload.filename)
+    return await upload_sessions.create(payload.filename, payload.size, payload.sha256)
+
+
+@router.get("/sessions/{upload_id}")
+async def get_upload_session(upload_id: str, response: Response):
+    session = await upload_sessions.get(upload_id)
+    response.headers["Upload-Offset"] = str(session["offset"])
+    return session
+
+
+@router.put("/sessions/{upload_id}")
+async def put_upload_chunk(
+    upload_id: str,
+    request: Request,
+    response: Response,
+    content_range: str = Header(..., alias="Content-Range"),
+    chunk_sha256: str = Header(..., alias="X-Chunk-SHA256"),
+):
+    """Append one chunk; ``Content-Range: bytes start-end/size`` must start at the received offset."""
+    match = CONTENT_RANGE.fullmatch(content_range.strip())
+    if not match:
+        raise HTTPException(status_code=400, detail="Content-Range must look like 'bytes start-end/size'")
+    start, end, total = (int(group) for group in match.groups())
+    session = await upload_sessions.write_chunk(upload_id, start, end, total, chunk_sha256, request.stream())
+    response.headers["Upload-Offset"] = str(session["offset"])
+    return session
+
+
+@router.post("/sessions/{upload_id}/complete")
+async def complete_upload_session(upload_id: str):
+    """Finalize a fully received upload into a regular file record (same response as POST /upload)."""
+    session = await upload_sessions.complete(upload_id)
+    db = get_db()
+    if await db.files.find_one({"fileId": session["fileId"]}, {"_id": 1}):
+        return {"fileId": session["fileId"], "filename": session["filename"], "status": "uploaded"}
+    saved_path = str(storage.BASE_DIR / session["fileId"] / session["filename"])
+    return await _register(session["fileId"], session["filename"], saved_path)
 
-    return {"fileId": file_id, "filename": file.filename, "status": "uploaded"}
 
+@router.delete("/sessions/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def abort_upload_session(upload_id: str):
+    await upload_sessions.abort(upload_id)
@@ -94,6 +94,16 @@ class EditPayload(BaseModel):
     value: str
 
 
+class FieldEdit(BaseModel):
+    field: str
+    value: str
+
+
+class BatchEditPayload(BaseModel):
+    fileId: str
+    edits: List[FieldEdit] = Field(..., min_length=1)
+
+
 class ExtractionResponse(BaseModel):
     data: ExtractionRecord
     citations: List[Citation] = []
@@ -0,0 +1,156 @@
+import json
+import logging
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+from uuid import uuid4
+import pyarrow as pa
+import pyarrow.parquet as pq
+from app.config import get_settings
+from app.db import get_db
+from app.schemas.extraction import ExtractionRecord
+from app.services.extractor import DATE_FIELDS, SERIES_PATTERNS, _clean_amount, _normalize_date
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_FILE = "_watermark.json"
+PARTITION_KEY = "extracted_date"
+
+RECORD_FIELDS = [field for field in ExtractionRecord.model_fields.keys() if field != "fileId"]
+AMOUNT_FIELDS = {field for field in RECORD_FIELDS if any(field.startswith(base) for base in SERIES_PATTERNS)}
+
+# Heavy columns that analysts never read from the snapshot
+SNAPSHOT_PROJECTION = {"_id": 0, "textBlocks": 0, "normalizedText": 0, "citations": 0}
+
+
+def _column_type(field: str) -> pa.DataType:
+    if field in AMOUNT_FIELDS:
+        return pa.float64()
+    if field in DATE_FIELDS:
+        return pa.date32()
+    return pa.string()
+
+
+SCHEMA = pa.schema(
+    [
+        pa.field("fileId", pa.string()),
+        pa.field("documentType", pa.string()),
+        pa.field("extractedAt", pa.timestamp("us")),
+        *[pa.field(field, _column_type(field)) for field in RECORD_FIELDS],
+    ]
+)
+
+
+def _to_amount(value: Any) -> Optional[float]:
+    if value is None or value == "":
+        return None
+    cleaned = _clean_amount(str(value))
+    try:
+        return float(cleaned)
+    except ValueError:
+        return None
+
+
+def _to_date(value: Any) -> Optional[date]:
+    if not value:
+        return None
+    try:
+        return datetime.strptime(_normalize_date(str(value)), "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+def to_row(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a stored extraction document into a typed snapshot row."""
+    row: Dict[str, Any] = {
+        "fileId": doc.get("fileId"),
+        "documentType": doc.get("documentType"),
+        "extractedAt": doc.get("extractedAt"),
+    }
+    for field in RECORD_FIELDS:
+        value = doc.get(field, "")
+        if field in AMOUNT_FIELDS:
+            row[field] = _to_amount(value)
+        elif field in DATE_FIELDS:
+            row[field] = _to_date(value)
+        else:
+            row[field] = value or None
+    return row
+
+
+def _dataset_dir() -> Path:
+    path = Path(get_settings().analytics_dir)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _row_key(file_id: Any, extracted_at: datetime) -> str:
+    return f"{file_id}@{extracted_at.isoformat()}"
+
+
+def read_watermark(base_dir: Path) -> Tuple[Optional[datetime], Set[str]]:
+    """Return the newest snapshotted ``extractedAt`` and the keys of rows written within the overlap window."""
+    path = base_dir / WATERMARK_FILE
+    if not path.exists():
+        return None, set()
+    data = json.loads(path.read_text())
+    watermark = datetime.fromisoformat(data["extractedAt"]) if data.get("extractedAt") else None
+    return watermark, set(data.get("recent", []))
+
+
+def write_watermark(base_dir: Path, watermark: datetime, recent: Set[str]) -> None:
+    path = base_dir / WATERMARK_FILE
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps({"extractedAt": watermark.isoformat(), "recent": sorted(recent)}))
+    tmp_path.replace(path)
+
+
+def write_partitions(base_dir: Path, rows: List[Dict[str, Any]]) -> List[str]:
+    """Append rows as new files under hive-style extracted_date=YYYY-MM-DD partitions."""
+    by_day: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        by_day.setdefault(row["extractedAt"].strftime("%Y-%m-%d"), []).append(row)
+
+    written: List[str] = []
+    for day, day_rows in sorted(by_day.items()):
+        partition_dir = base_dir / f"{PARTITION_KEY}={day}"
+        partition_dir.mkdir(parents=True, exist_ok=True)
+        table = pa.Table.from_pylist(day_rows, schema=SCHEMA)
+        target = partition_dir / f"part-{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid4().hex[:8]}.parquet"
+        pq.write_table(table, target)
+        written.append(str(target))
+    return written
+
+
+async def append_snapshot() -> Dict[str, Any]:
+    """Append extractions newer than the stored watermark to the Parquet dataset.
+
+    Every extraction run (and every edit, which bumps ``extractedAt``) becomes
+    one row; a changed file shows up again in a later partition, so readers
+    should keep the latest ``extractedAt`` per ``fileId``. The query starts
+    ``ANALYTICS_OVERLAP_SECONDS`` before the watermark, because a write stamped
+    before the last snapshot's read can land after it; rows already written in
+    that window are recognised by fileId and ``extractedAt`` and skipped.
+    """
+    base_dir = _dataset_dir()
+    watermark, recent = read_watermark(base_dir)
+    overlap = timedelta(seconds=get_settings().analytics_overlap_seconds)
+    query: Dict[str, Any] = {"extractedAt": {"$gt": watermark - overlap} if watermark else {"$exists": True}}
+
+    db = get_db()
+    cursor = db.extractions.find(query, SNAPSHOT_PROJECTION).sort("extractedAt", 1)
+    rows = [
+        to_row(doc) async for doc in cursor if _row_key(doc.get("fileId"), doc["extractedAt"]) not in recent
+    ]
+    if not rows:
+        return {"rows": 0, "files": [], "watermark": watermark.isoformat() if watermark else None}
+
+    files = write_partitions(base_dir, rows)
+    new_watermark = max(rows[-1]["extractedAt"], watermark) if watermark else rows[-1]["extractedAt"]
+    recent |= {_row_key(row["fileId"], row["extractedAt"]) for row in rows}
+    # Keys older than the next query's window can't come back; drop them to keep the file small
+    cutoff = new_watermark - overlap
+    recent = {key for key in recent if datetime.fromisoformat(key.rsplit("@", 1)[1]) > cutoff}
+    write_watermark(base_dir, new_watermark, recent)
+    logger.info("Appended %s extraction rows to %s", len(rows), base_dir)
+    return {"rows": len(rows), "files": files, "watermark": new_watermark.isoformat()}
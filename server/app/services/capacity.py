@@ -0,0 +1,90 @@
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+from app.config import get_settings
+from app.services import metrics
+
+MIN_RETRY_AFTER = 1
+MAX_RETRY_AFTER = 300
+# Weight of the newest sample in the moving average of slot hold time
+EWMA_ALPHA = 0.2
+
+
+class CapacityExceeded(Exception):
+    def __init__(self, stage: str, retry_after: int):
+        super().__init__(f"{stage} capacity exhausted, retry in {retry_after}s")
+        self.stage = stage
+        self.retry_after = retry_after
+
+
+class StageLimiter:
+    """Caps concurrent work in one stage and bounds how many callers may wait for a slot.
+
+    ``max_pending=None`` lets callers queue without limit; use it for inner
+    stages whose callers were already admitted by an outer limiter.
+    """
+
+    def __init__(self, name: str, limit: int, max_pending: Optional[int] = None):
+        self.name = name
+        self.limit = max(1, limit)
+        self.max_pending = max_pending
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.avg_seconds = 0.0
+        self._semaphore = asyncio.Semaphore(self.limit)
+
+    def retry_after(self) -> int:
+        rounds = math.ceil((self.waiting + 1) / self.limit)
+        estimate = math.ceil(rounds * (self.avg_seconds or MIN_RETRY_AFTER))
+        return max(MIN_RETRY_AFTER, min(MAX_RETRY_AFTER, estimate))
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        if self._semaphore.locked() and self.max_pending is not None and self.waiting >= self.max_pending:
+            self.rejected += 1
+            metrics.CAPACITY_REJECTIONS.inc(stage=self.name)
+            raise CapacityExceeded(self.name, self.retry_after())
+
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.avg_seconds = elapsed if not self.avg_seconds else (
+                EWMA_ALPHA * elapsed + (1 - EWMA_ALPHA) * self.avg_seconds
+            )
+            self.active -= 1
+            self._semaphore.release()
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "waiting": self.waiting,
+            "maxPending": self.max_pending,
+            "utilisation": round(self.active / self.limit, 3),
+            "rejected": self.rejected,
+            "avgSeconds": round(self.avg_seconds, 3),
+        }
+
+
+_settings = get_settings()
+# Requests are admitted (or rejected) at the extraction stage; OCR and LLM callers only wait
+extraction = StageLimiter("extraction", _settings.extraction_concurrency, _settings.extraction_queue_size)
+ocr = StageLimiter("ocr", _settings.ocr_concurrency)
+llm = StageLimiter("llm", _settings.llm_concurrency)
+
+STAGES = (extraction, ocr, llm)
+
+
+def snapshot() -> Dict[str, Dict[str, object]]:
+    return {stage.name: stage.snapshot() for stage in STAGES}
@@ -1,4 +1,4 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from difflib import SequenceMatcher
 import re
 
@@ -18,7 +18,7 @@ def _extract_numeric_value(text: str) -> Optional[str]:
     return cleaned if cleaned else None
 
 
-def _best_block(value: str, blocks: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+def _prepare_target(value: str) -> Optional[Tuple[str, Optional[str]]]:
     if not value or not value.strip():
         return None
     
@@ -28,48 +28,68 @@ def _best_block(value: str, blocks: List[Dict[str, Any]]) -> Optional[Dict[str,
     if len(target_clean) > 100:
         target_clean = target_clean[:100]
     
-    target = _normalize_for_matching(target_clean)
-    target_numeric = _extract_numeric_value(target_clean)
+    return _normalize_for_matching(target_clean), _extract_numeric_value(target_clean)
+
+
+def _prepare_candidate(block: Dict[str, Any]) -> Optional[Tuple[str, Optional[str]]]:
+    candidate_text = block.get("text", "")
+    if not candidate_text or not candidate_text.strip():
+        return None
+    
+    # Limit candidate text length to prevent matching large blocks
+    candidate_text_limited = candidate_text[:200] if len(candidate_text) > 200 else candidate_text
+    return _normalize_for_matching(candidate_text_limited), _extract_numeric_value(candidate_text_limited)
+
+
+def _score(
+    target: str,
+    target_numeric: Optional[str],
+    candidate: str,
+    candidate_numeric: Optional[str],
+    fuzzy: bool = True,
+) -> float:
+    # Exact match (after normalization)
+    if target == candidate:
+        return 1.0
+    # Exact substring match (prefer shorter matches)
+    if target in candidate:
+        # Penalize if candidate is much longer than target (likely concatenated)
+        length_ratio = len(candidate) / len(target) if len(target) > 0 else 1
+        if length_ratio > 2:
+            return 0.7  # Reduced score for overly long matches
+        return 0.9
+    if candidate in target:
+        return 0.85
+    # Numeric match (for amounts, dates)
+    if target_numeric and candidate_numeric and target_numeric == candidate_numeric:
+        return 0.85
+    # Partial numeric match (for series fields like "medical paid 2")
+    if target_numeric and candidate_numeric and target_numeric in candidate_numeric:
+        return 0.75
+    if not fuzzy:
+        return 0.0
+    # Similarity match
+    score = SequenceMatcher(None, target, candidate).ratio()
+    # Boost score if there's any overlap, but penalize long candidates
+    if len(target) > 3 and any(word in candidate for word in target.split() if len(word) > 2):
+        length_penalty = min(len(candidate) / len(target), 2.0)  # Penalize if candidate is much longer
+        score = max(score / length_penalty, 0.5)
+    return score
+
+
+def _best_block(value: str, blocks: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    prepared = _prepare_target(value)
+    if prepared is None:
+        return None
+    target, target_numeric = prepared
     best = None
     best_score = 0.0
 
     for block in blocks:
-        candidate_text = block.get("text", "")
-        if not candidate_text or not candidate_text.strip():
+        candidate = _prepare_candidate(block)
+        if candidate is None:
             continue
-        
-        # Limit candidate text length to prevent matching large blocks
-        candidate_text_limited = candidate_text[:200] if len(candidate_text) > 200 else candidate_text
-        candidate = _normalize_for_matching(candidate_text_limited)
-        candidate_numeric = _extract_numeric_value(candidate_text_limited)
-        
-        # Exact match (after normalization)
-        if target == candidate:
-            score = 1.0
-        # Exact substring match (prefer shorter matches)
-        elif target in candidate:
-            # Penalize if candidate is much longer than target (likely concatenated)
-            length_ratio = len(candidate) / len(target) if len(target) > 0 else 1
-            if length_ratio > 2:
-                score = 0.7  # Reduced score for overly long matches
-            else:
-                score = 0.9
-        elif candidate in target:
-            score = 0.85
-        # Numeric match (for amounts, dates)
-        elif target_numeric and candidate_numeric and target_numeric == candidate_numeric:
-            score = 0.85
-        # Partial numeric match (for series fields like "medical paid 2")
-        elif target_numeric and candidate_numeric and target_numeric in candidate_numeric:
-            score = 0.75
-        # Similarity match
-        else:
-            score = SequenceMatcher(None, target, candidate).ratio()
-            # Boost score if there's any overlap, but penalize long candidates
-            if len(target) > 3 and any(word in candidate for word in target.split() if len(word) > 2):
-                length_penalty = min(len(candidate) / len(target), 2.0)  # Penalize if candidate is much longer
-                score = max(score / length_penalty, 0.5)
-        
+        score = _score(target, target_numeric, *candidate)
         if score > best_score:
             best = block
             best_score = score
@@ -80,7 +100,54 @@ def _best_block(value: str, blocks: List[Dict[str, Any]]) -> Optional[Dict[str,
     return best
 
 
-def map_fields_to_boxes(fields: Dict[str, str], blocks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def _best_blocks(
+    values: Dict[str, str], blocks: List[Dict[str, Any]], fuzzy: bool = True
+) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Same result as calling ``_best_block`` per value, but each block is normalized only once.
+
+    ``fuzzy=False`` skips the SequenceMatcher fallback and only keeps exact,
+    substring and numeric matches.
+    """
+    targets = {field: _prepare_target(value) for field, value in values.items()}
+    active = {field: prepared for field, prepared in targets.items() if prepared is not None}
+    best: Dict[str, Optional[Dict[str, Any]]] = {field: None for field in values}
+    best_scores = {field: 0.0 for field in active}
+
+    for block in blocks:
+        candidate = _prepare_candidate(block)
+        if candidate is None:
+            continue
+        for field, (target, target_numeric) in active.items():
+            score = _score(target, target_numeric, *candidate, fuzzy=fuzzy)
+            if score > best_scores[field]:
+                best[field] = block
+                best_scores[field] = score
+
+    for field, score in best_scores.items():
+        if score < 0.5:
+            best[field] = None
+    return best
+
+
+def _citation(field: str, match: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    cited = {
+        "field": field,
+        "page": match["page"] if match else None,
+        "bounds": match["bounds"] if match else None,
+        "snippet": match["text"] if match else None,
+    }
+    # Workbook blocks name their tab; page is the tab's 1-based index
+    if match and "sheet" in match:
+        cited["sheet"] = match["sheet"]
+    return cited
+
+
+def map_fields_to_boxes(fields: Dict[str, str], blocks: List[Dict[str, Any]], fuzzy: bool = True) -> List[Dict[str, Any]]:
+    if not fuzzy:
+        values = {field: str(value) for field, value in fields.items() if value and str(value).strip() and field != "fileId"}
+        matches = _best_blocks(values, blocks, fuzzy=False)
+        return [_citation(field, matches[field]) for field in values]
+
     citations: List[Dict[str, Any]] = []
     used_blocks = set()  # Track used blocks to avoid duplicate citations
     
@@ -97,14 +164,7 @@ def map_fields_to_boxes(fields: Dict[str, str], blocks: List[Dict[str, Any]]) ->
             if block_id not in used_blocks:
                 used_blocks.add(block_id)
         
-        citations.append(
-            {
-                "field": field,
-                "page": match["page"] if match else None,
-                "bounds": match["bounds"] if match else None,
-                "snippet": match.get("text") if match else None,
-            }
-        )
+        citations.append(_citation(field, match))
     
     return citations
 
@@ -112,14 +172,15 @@ def map_fields_to_boxes(fields: Dict[str, str], blocks: List[Dict[str, Any]]) ->
 def update_single_field(field: str, value: str, blocks: List[Dict[str, Any]], existing: List[Dict[str, Any]]):
     blocks = blocks or []
     existing = existing or []
-    match = _best_block(value, blocks)
-    updated = {
-        "field": field,
-        "page": match["page"] if match else None,
-        "bounds": match["bounds"] if match else None,
-        "snippet": match["text"] if match else None,
-    }
+    updated = _citation(field, _best_block(value, blocks))
     remaining = [c for c in existing if c.get("field") != field]
     remaining.append(updated)
     return remaining
 
+
+def update_fields(values: Dict[str, str], blocks: List[Dict[str, Any]], existing: List[Dict[str, Any]]):
+    """Batch version of ``update_single_field``: one matcher pass for all edited fields."""
+    matches = _best_blocks(values, blocks or [])
+    remaining = [c for c in (existing or []) if c.get("field") not in values]
+    remaining.extend(_citation(field, matches[field]) for field in values)
+    return remaining
@@ -0,0 +1,42 @@
+import math
+import time
+from typing import List, Optional
+from app.config import get_settings
+
+# Rough costs used to decide whether a stage still fits in the remaining budget
+OCR_PAGE_SECONDS = 4.0
+LLM_MIN_SECONDS = 15.0
+FUZZY_CITATION_SECONDS = 2.0
+
+
+class Deadline:
+    """Time budget for one extraction, checked by each stage before it starts expensive work.
+
+    Stages that give up record themselves in ``skipped`` so the stored result can
+    be marked partial and completed later.
+    """
+
+    def __init__(self, seconds: Optional[float] = None):
+        self.seconds = seconds if seconds and seconds > 0 else None
+        self._expires_at = time.monotonic() + self.seconds if self.seconds else None
+        self.skipped: List[str] = []
+
+    @classmethod
+    def from_settings(cls, seconds: Optional[float] = None) -> "Deadline":
+        return cls(seconds if seconds is not None else get_settings().extraction_deadline_seconds)
+
+    def remaining(self) -> float:
+        if self._expires_at is None:
+            return math.inf
+        return max(0.0, self._expires_at - time.monotonic())
+
+    def allows(self, estimate: float) -> bool:
+        return self.remaining() >= estimate
+
+    def skip(self, stage: str) -> None:
+        if stage not in self.skipped:
+            self.skipped.append(stage)
+
+    @property
+    def partial(self) -> bool:
+        return bool(self.skipped)
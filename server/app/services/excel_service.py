@@ -1,6 +1,10 @@
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
 import pandas as pd
 import re
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, List, Optional, Tuple
+from app.config import get_settings
 
 
 # Field name mappings for common column header variations
@@ -88,22 +92,37 @@ def _map_column_to_field(col_name: str) -> Optional[str]:
     return None
 
 
-def read_table(path: str) -> Dict[str, Any]:
-    try:
-        if path.lower().endswith(".csv"):
-            df = pd.read_csv(path)
-            sheet_name = "Sheet1"  # CSV doesn't have sheet names
-        else:
-            # For Excel, try to get sheet name
-            excel_file = pd.ExcelFile(path)
-            sheet_name = excel_file.sheet_names[0] if excel_file.sheet_names else "Sheet1"
-            df = pd.read_excel(path, sheet_name=sheet_name)
-    except Exception as exc:
-        raise ValueError(f"Unable to parse spreadsheet: {exc}") from exc
+Bounds = Callable[[int, int], Dict[str, float]]
+
+
+def _grid_bounds(row_idx: int, col_idx: int) -> Dict[str, float]:
+    # Spreadsheets have no geometry: lay cells out on a fixed grid, header row first
+    return {
+        "x": float(col_idx * 100),
+        "y": float(row_idx * 20),
+        "width": 100.0,
+        "height": 20.0,
+    }
+
 
+SheetBlocks = Tuple[List[Dict[str, Any]], List[str], Dict[int, Optional[str]]]
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def frame_blocks(
+    df: pd.DataFrame, page: int = 1, bounds: Bounds = _grid_bounds, sheet: Optional[str] = None
+) -> SheetBlocks:
+    """Turn a table into header and cell blocks; cells carry the field their column maps to.
+
+    ``bounds(row, col)`` gives each block's box, with row 0 being the header.
+    Workbook blocks also carry their ``sheet`` name. Also returns one text
+    segment per data row and the column -> field mapping.
+    """
     df = df.fillna("")
     blocks: List[Dict[str, Any]] = []
     text_segments: List[str] = []
+    located = {"page": page} if sheet is None else {"page": page, "sheet": sheet}
     
     # Map column headers to field names
     column_to_field: Dict[int, Optional[str]] = {}
@@ -111,16 +130,7 @@ def read_table(path: str) -> Dict[str, Any]:
         field_name = _map_column_to_field(str(col_name))
         column_to_field[col_idx] = field_name
         # Store column header as a block
-        blocks.append({
-            "text": str(col_name),
-            "page": 1,
-            "bounds": {
-                "x": float(col_idx * 100),
-                "y": 0.0,
-                "width": 100.0,
-                "height": 20.0,
-            },
-        })
+        blocks.append({"text": str(col_name), **located, "bounds": bounds(0, col_idx)})
 
     # Process data rows
     for row_idx, (_, row) in enumerate(df.iterrows()):
@@ -137,21 +147,86 @@ def read_table(path: str) -> Dict[str, Any]:
             blocks.append(
                 {
                     "text": value_str,
-                    "page": 1,
-                    "bounds": {
-                        "x": float(col_idx * 100),
-                        "y": float((row_idx + 1) * 20),  # +1 to account for header row
-                        "width": 100.0,
-                        "height": 20.0,
-                    },
+                    **located,
+                    "bounds": bounds(row_idx + 1, col_idx),  # +1 to account for header row
                     "field": field_name,  # Store field mapping for easier extraction
                 }
             )
 
+    return blocks, text_segments, column_to_field
+
+
+def _sheet_blocks(df: pd.DataFrame, page: int, sheet: Optional[str]) -> SheetBlocks:
+    # Module-level so it can run in worker processes
+    return frame_blocks(df, page, sheet=sheet)
+
+
+def _worker_count() -> int:
+    return get_settings().pdf_workers or os.cpu_count() or 1
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn, not fork, for the same reason as pdf_service's pool
+        _pool = ProcessPoolExecutor(max_workers=_worker_count(), mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def shutdown() -> None:
+    """Stop the sheet workers; called on shutdown so no spawned process outlives the app."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+
+
+def _load_sheets(path: str) -> Dict[str, pd.DataFrame]:
+    if path.lower().endswith(".csv"):
+        return {"Sheet1": pd.read_csv(path)}  # CSV doesn't have sheet names
+    # sheet_name=None parses the workbook once and returns every sheet, in tab order
+    sheets = pd.read_excel(path, sheet_name=None)
+    return sheets or {"Sheet1": pd.DataFrame()}
+
+
+def read_table(path: str) -> Dict[str, Any]:
+    """Read every sheet; blocks use the 1-based sheet index as their page and carry the sheet name (CSV blocks don't).
+
+    Workbooks with several sheets and at least ``table_parallel_min_cells``
+    cells build their blocks in worker processes, one sheet per task.
+    """
+    try:
+        sheets = _load_sheets(path)
+    except Exception as exc:
+        raise ValueError(f"Unable to parse spreadsheet: {exc}") from exc
+
+    names = list(sheets)
+    # CSV has no tabs: its blocks and citations carry no sheet, as before multi-sheet support
+    tabs: List[Optional[str]] = [None] if path.lower().endswith(".csv") else list(names)
+    cells = sum(df.size for df in sheets.values())
+    parallel = len(sheets) > 1 and cells >= get_settings().table_parallel_min_cells and _worker_count() > 1
+    if parallel:
+        pool = _get_pool()
+        futures = [pool.submit(_sheet_blocks, sheets[name], index + 1, tabs[index]) for index, name in enumerate(names)]
+        results = [future.result() for future in futures]
+    else:
+        results = [_sheet_blocks(sheets[name], index + 1, tabs[index]) for index, name in enumerate(names)]
+
+    blocks: List[Dict[str, Any]] = []
+    text_segments: List[str] = []
+    column_mappings: Dict[str, Dict[int, str]] = {}
+    for name, (sheet_blocks, sheet_segments, column_to_field) in zip(names, results):
+        blocks.extend(sheet_blocks)
+        text_segments.extend(sheet_segments)
+        column_mappings[name] = {col: field for col, field in column_to_field.items() if field}
+
+    # The first tab with recognised columns is the one structured values mostly come from
+    sheet_name = next((name for name in names if column_mappings[name]), names[0])
     return {
         "blocks": blocks,
         "full_text": "\n".join(text_segments),
         "sheet_name": sheet_name,
-        "column_mappings": {col: field for col, field in enumerate(column_to_field.values()) if field}
+        "sheet_names": [tab for tab in tabs if tab is not None],
+        "cell_count": len(blocks) - sum(len(sheets[name].columns) for name in names),
+        "column_mappings": column_mappings,
     }
-
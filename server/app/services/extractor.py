@@ -1,10 +1,13 @@
+import asyncio
 import logging
 import re
 from datetime import datetime
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from app.config import get_settings
 from app.schemas.extraction import ExtractionRecord
 from app.db import get_db
-from app.services import pdf_service, excel_service, ocr_service, citation
+from app.services import pdf_service, excel_service, ocr_service, capacity, citation, metrics, prerender, profiling, progress, templates
+from app.services.deadline import Deadline, FUZZY_CITATION_SECONDS, LLM_MIN_SECONDS, OCR_PAGE_SECONDS
 from app.utils.file_detector import detect_type, DocumentType
 from app.utils.llm_fallback import infer_with_llama
 
@@ -79,6 +82,19 @@ SERIES_PATTERNS = {
 }
 
 CRITICAL_FIELDS = ["policyNumber", "claimNumber", "insured", "carrier", "dateOfLoss"]
+# PDF tables stand in for the LLM only when they fill at least this many fields and most of those found
+TABLE_LLM_MIN_FIELDS = 3
+
+# For certain fields, apply strict length limits
+MAX_LENGTHS = {
+    "policyNumber": 30,
+    "claimNumber": 30,
+    "state": 3,
+    "claimStatus": 10,
+    "city": 50,
+    "lob": 60,
+    "claimant": 50,
+}
 
 
 def _normalize_date(value: str) -> str:
@@ -167,14 +183,21 @@ def _extract_series(source_text: str, base_field: str, meta: Dict) -> Dict[str,
     return result
 
 
-def rule_based_extract(raw_text: str) -> Dict[str, str]:
+def rule_based_extract(raw_text: str, fields: Optional[Iterable[str]] = None) -> Dict[str, str]:
+    """Run the regex passes; ``fields`` restricts them to a subset of TEXT_PATTERNS/SERIES_PATTERNS."""
     extracted: Dict[str, str] = {}
+    text_patterns = TEXT_PATTERNS
+    series_patterns = SERIES_PATTERNS
+    if fields is not None:
+        wanted = set(fields)
+        text_patterns = {field: pattern for field, pattern in TEXT_PATTERNS.items() if field in wanted}
+        series_patterns = {field: meta for field, meta in SERIES_PATTERNS.items() if field in wanted}
     
     # Split text into sentences/lines for better context
     # This helps prevent matching across unrelated sections
     text_lines = re.split(r'[.\n]', raw_text)
     
-    for field, pattern in TEXT_PATTERNS.items():
+    for field, pattern in text_patterns.items():
         # Try to find match in each line first (more accurate)
         best_match = None
         best_line = None
@@ -200,18 +223,8 @@ def rule_based_extract(raw_text: str) -> Dict[str, str]:
             # Remove trailing punctuation that might have been captured
             value = re.sub(r'[.,;:]+$', '', value)
             
-            # For certain fields, apply strict length limits
-            max_lengths = {
-                "policyNumber": 30,
-                "claimNumber": 30,
-                "state": 3,
-                "claimStatus": 10,
-                "city": 50,
-                "lob": 60,
-                "claimant": 50,
-            }
-            if field in max_lengths:
-                value = value[:max_lengths[field]]
+            if field in MAX_LENGTHS:
+                value = value[:MAX_LENGTHS[field]]
             
             # Validate state codes
             if field == "state" and len(value) > 3:
@@ -223,88 +236,476 @@ def rule_based_extract(raw_text: str) -> Dict[str, str]:
             if value and value != "":
                 extracted[field] = value
 
-    for base_field, meta in SERIES_PATTERNS.items():
+    for base_field, meta in series_patterns.items():
         extracted.update(_extract_series(raw_text, base_field, meta))
 
     return extracted
 
 
-def _coverage(fields: Dict[str, str]) -> float:
-    if not CRITICAL_FIELDS:
+def clean_field_value(field: str, raw: str) -> str:
+    """Clean a raw capture the way ``rule_based_extract`` does, so template lookups match regex output."""
+    if field.rstrip("0123456789") in SERIES_PATTERNS:
+        return _clean_amount(raw)
+    value = re.sub(r'\s+', ' ', raw.strip())
+    value = re.sub(r'[.,;:]+$', '', value)
+    if field in MAX_LENGTHS:
+        value = value[:MAX_LENGTHS[field]]
+    if field in DATE_FIELDS:
+        value = _normalize_date(value)
+    return value
+
+
+def _coverage(fields: Dict[str, str], required: List[str] = CRITICAL_FIELDS) -> float:
+    if not required:
         return 1.0
-    hits = sum(1 for field in CRITICAL_FIELDS if fields.get(field))
-    return hits / len(CRITICAL_FIELDS) if CRITICAL_FIELDS else 1.0
+    hits = sum(1 for field in required if fields.get(field))
+    return hits / len(required) if required else 1.0
 
 
-async def run_extraction(file_doc: Dict) -> Tuple[Dict, List[Dict]]:
+async def run_extraction(file_doc: Dict, deadline: Optional[Deadline] = None) -> Tuple[Dict, List[Dict]]:
     file_path = file_doc["path"]
     file_id = file_doc["fileId"]
-    doc_type = detect_type(file_path)
+    deadline = deadline or Deadline.from_settings()
+    timer = metrics.StageTimer()
+    report = progress.broker.reporter(file_id)
+    report("started")
+    doc_type: Optional[DocumentType] = None
+    # Every failure after "started" must end the run with "failed", or SSE subscribers wait forever
+    try:
+        with timer.stage("detect_type"):
+            doc_type = detect_type(file_path)
+        report("detected", documentType=doc_type.value)
+        record_data, citations, payload = await _extract(file_path, file_id, doc_type, timer, report, deadline)
+    except Exception as exc:
+        metrics.EXTRACTIONS.inc(document_type=doc_type.value if doc_type else "unknown", status="failed")
+        report("failed", error=str(exc))
+        raise
+
+    payload["timings"] = timer.as_dict()
+    profiling.record_timings(payload["timings"])
+    db = get_db()
+    # The write that stores the breakdown can't time itself, so db_write is only visible on /metrics
+    with timer.stage("db_write"):
+        await db.extractions.update_one({"fileId": file_id}, {"$set": payload}, upsert=True)
+        await db.files.update_one(
+            {"fileId": file_id},
+            {
+                "$set": {
+                    "status": "extracted",
+                    "documentType": doc_type.value,
+                    "extractedAt": payload["extractedAt"],
+                    "partial": deadline.partial,
+                    **file_summary(record_data),
+                }
+            },
+        )
+    if deadline.partial:
+        await _schedule_completion(file_id, deadline.skipped)
+
+    prerender.schedule_cited_pages(file_path, citations)
+    metrics.EXTRACTION_SECONDS.observe(timer.elapsed(), document_type=doc_type.value)
+    metrics.EXTRACTIONS.inc(document_type=doc_type.value, status="extracted")
+    report("completed", fieldsFound=_fields_found(record_data), partial=deadline.partial)
+    return record_data, citations
+
+
+async def extract_local(file_path: str, file_id: str) -> Dict:
+    """Run the pipeline on a local file and return the extraction document without storing it.
+
+    Used by ``app.cli``: no progress events, metrics exports or file status
+    updates, and no deadline. Mongo is only touched when templates are enabled.
+    """
+    timer = metrics.StageTimer()
+    with timer.stage("detect_type"):
+        doc_type = detect_type(file_path)
+    _, _, payload = await _extract(file_path, file_id, doc_type, timer, lambda stage, **data: None, Deadline())
+    payload["timings"] = timer.as_dict()
+    return payload
+
 
+async def _schedule_completion(file_id: str, skipped: List[str]) -> None:
+    # Imported here: the worker package imports this module
+    from app.workers.mongo_queue import get_job_queue
+
+    logger.info("Extraction of %s ran out of time; skipped %s", file_id, ", ".join(skipped))
+    for stage in skipped:
+        metrics.SKIPPED_STAGES.inc(stage=stage)
+    await get_job_queue().enqueue(file_id, kind="complete")
+
+
+def _unknown_rule_fields(known: Set[str]) -> List[str]:
+    """Regex fields still worth running; a series is only skipped when every numbered output is known."""
+    fields = [field for field in TEXT_PATTERNS if field not in known]
+    for field, meta in SERIES_PATTERNS.items():
+        outputs = [field] + [f"{field}{index}" for index in range(2, meta["count"] + 1)]
+        if not known.issuperset(outputs):
+            fields.append(field)
+    return fields
+
+
+def _structured_values(blocks: List[Dict], into: Dict[str, str]) -> None:
+    """Take the first non-empty cell of every column that maps to a field."""
+    for block in blocks:
+        if "field" in block and block.get("field") and block.get("text"):
+            field_name = block["field"]
+            value = str(block["text"]).strip()
+            if value and value != "" and not into.get(field_name):
+                into[field_name] = value
+
+
+def _fields_found(fields: Dict[str, str]) -> int:
+    return sum(1 for key, value in fields.items() if value and key != "fileId")
+
+
+def file_summary(record: Dict[str, str]) -> Dict[str, object]:
+    """Extraction stats kept on the ``files`` record so listings can filter and show them without a join."""
+    return {"coverage": _coverage(record), "fieldsFound": _fields_found(record)}
+
+
+async def _extract(
+    file_path: str,
+    file_id: str,
+    doc_type: DocumentType,
+    timer: metrics.StageTimer,
+    report: progress.Reporter,
+    deadline: Deadline,
+) -> Tuple[Dict, List[Dict], Dict]:
     text_blocks: List[Dict] = []
     full_text_segments: List[str] = []
-    structured_field_values: Dict[str, str] = {}  # For Excel/CSV structured extraction
+    structured_field_values: Dict[str, str] = {}  # Excel/CSV and PDF table column mappings
     table_result = None
+    pending_pages: List[int] = []
+    streaming = get_settings().extraction_mode == "streaming"
 
-    if doc_type in {DocumentType.DIGITAL_PDF, DocumentType.SCANNED_PDF}:
-        pdf_result = pdf_service.extract_text_with_boxes(file_path)
+    if doc_type in {DocumentType.DIGITAL_PDF, DocumentType.SCANNED_PDF} and streaming:
+        pending_pages = await _stream_pdf(
+            file_path, text_blocks, full_text_segments, structured_field_values, timer, report, deadline
+        )
+    elif doc_type in {DocumentType.DIGITAL_PDF, DocumentType.SCANNED_PDF}:
+        # Parsing and OCR run off the event loop so progress events and other requests keep flowing
+        with timer.stage("pdf_parse"):
+            pdf_result = await asyncio.to_thread(
+                pdf_service.extract_text_with_boxes,
+                file_path,
+                lambda page, pages: report("pdf_parse", page=page, pages=pages),
+            )
+        timer.count("pages", pdf_result.page_count)
+        timer.count("text_blocks", len(pdf_result.blocks))
         text_blocks.extend(pdf_result.blocks)
         full_text_segments.append(pdf_result.full_text)
+        if pdf_result.table_blocks:
+            timer.count("table_cells", len(pdf_result.table_blocks))
+            text_blocks.extend(pdf_result.table_blocks)
+            _structured_values(pdf_result.table_blocks, structured_field_values)
         if pdf_result.empty_pages:
-            ocr_result = ocr_service.ocr_pages(file_path, pdf_result.empty_pages)
+            async with capacity.ocr.slot():
+                with timer.stage("ocr"):
+                    ocr_result = await asyncio.to_thread(
+                        ocr_service.ocr_pages,
+                        file_path,
+                        pdf_result.empty_pages,
+                        lambda page, pages: report("ocr", page=page, pages=pages),
+                        # Checked before every page, the first included, so the slot wait is charged too
+                        lambda: deadline.allows(OCR_PAGE_SECONDS),
+                    )
+            # Pages OCR had no time for are finished later, like streaming mode's pending pages
+            pending_pages = ocr_result["skipped_pages"]
+            if pending_pages:
+                deadline.skip("ocr")
+                report("deadline", skipped="ocr", pendingPages=len(pending_pages))
+            timer.count("ocr_pages", len(pdf_result.empty_pages) - len(pending_pages))
+            timer.count("ocr_blocks", len(ocr_result["blocks"]))
             text_blocks.extend(ocr_result["blocks"])
             full_text_segments.append(ocr_result["full_text"])
     elif doc_type in {DocumentType.EXCEL, DocumentType.CSV}:
-        table_result = excel_service.read_table(file_path)
+        report("table_parse")
+        with timer.stage("table_parse"):
+            table_result = await asyncio.to_thread(excel_service.read_table, file_path)
+        timer.count("table_cells", table_result.get("cell_count", 0))
         text_blocks.extend(table_result["blocks"])
         full_text_segments.append(table_result["full_text"])
         # Extract sheet name if available
         if "sheet_name" in table_result:
             structured_field_values["sheetName"] = table_result["sheet_name"]
         # Extract data from column mappings for structured extraction
-        for block in table_result["blocks"]:
-            if "field" in block and block.get("field") and block.get("text"):
-                field_name = block["field"]
-                value = str(block["text"]).strip()
-                if value and value != "" and not structured_field_values.get(field_name):
-                    structured_field_values[field_name] = value
+        _structured_values(table_result["blocks"], structured_field_values)
     else:
         raise ValueError("Unsupported document type")
 
+    use_templates = get_settings().templates_enabled and doc_type not in {DocumentType.EXCEL, DocumentType.CSV}
+    template_match, labels, template_hit = None, [], False
+    if use_templates:
+        with timer.stage("template_match"):
+            template_match, labels = await templates.match(text_blocks)
+            template_hit = template_match is not None and templates.apply(template_match, text_blocks, clean_field_value)
+
     raw_text = " ".join(segment for segment in full_text_segments if segment)
     normalized = normalize_text(raw_text)
-    field_values = rule_based_extract(raw_text)
-    
+    # Known layouts fill confirmed fields straight from their learned regions, and
+    # column-mapped values win the merge below, so the regex pass skips both
+    field_values = dict(template_match.values) if template_hit else {}
+    if template_hit:
+        report("template", templateId=template_match.template_id, fieldsFound=len(field_values))
+    known = set(field_values) | set(structured_field_values)
+    with timer.stage("rules"):
+        field_values.update(rule_based_extract(raw_text, fields=_unknown_rule_fields(known)))
+
     # Merge structured extraction results (Excel/CSV column mappings take precedence)
     for key, value in structured_field_values.items():
         if value and value != "":
             field_values[key] = value
     
     coverage = _coverage(field_values)
+    report("rules", fieldsFound=_fields_found(field_values), coverage=coverage)
 
-    if coverage < 0.65:
+    # When column-mapped PDF tables gave most of what the document has, the LLM would only reread the same cells;
+    # a stray mapped column (one "Date" table on an invoice) still leaves a low-coverage document to the LLM
+    table_fields = _fields_found(structured_field_values)
+    pdf_tables = (
+        doc_type in {DocumentType.DIGITAL_PDF, DocumentType.SCANNED_PDF}
+        and table_fields >= TABLE_LLM_MIN_FIELDS
+        and table_fields * 2 >= _fields_found(field_values)
+    )
+    needs_llm = coverage < 0.65 and not pdf_tables and get_settings().llm_enabled
+    if needs_llm and not deadline.allows(LLM_MIN_SECONDS):
+        deadline.skip("llm")
+        report("deadline", skipped="llm")
+    elif needs_llm:
         missing = [field for field in ExtractionRecord.model_fields if field not in field_values and field != "fileId"]
-        llm_suggestions = await infer_with_llama(normalized, missing)
-        for key, value in llm_suggestions.items():
-            if key == "fileId":
-                continue
-            if value and not field_values.get(key):
-                field_values[key] = value.strip()
+        report("llm_fallback", missingFields=len(missing))
+        with timer.stage("llm"):
+            llm_suggestions = await infer_with_llama(normalized, missing, deadline=deadline)
+        if "llm" in deadline.skipped:
+            report("deadline", skipped="llm")
+        _merge_llm(field_values, llm_suggestions)
 
     record = ExtractionRecord(fileId=file_id, **field_values)
     record_data = record.model_dump()
-    citations = citation.map_fields_to_boxes(record_data, text_blocks)
+    template_id = template_match.template_id if template_match else None
+    report("citations")
+    fuzzy = deadline.allows(FUZZY_CITATION_SECONDS)
+    if not fuzzy:
+        deadline.skip("fuzzy_citations")
+    with timer.stage("citations"):
+        if template_hit:
+            rest = {field: value for field, value in record_data.items() if field not in template_match.values}
+            cited = template_match.citations + citation.map_fields_to_boxes(rest, text_blocks, fuzzy=fuzzy)
+            order = list(record_data)
+            citations = sorted(cited, key=lambda entry: order.index(entry["field"]))
+        else:
+            citations = citation.map_fields_to_boxes(record_data, text_blocks, fuzzy=fuzzy)
+    if template_hit:
+        await templates.record_hit(template_id)
+    # Partial results would teach the template from incomplete data
+    if use_templates and not deadline.partial:
+        with timer.stage("template_learn"):
+            template_id = await templates.learn(
+                template_match, labels, record_data, citations, text_blocks, clean_field_value
+            )
 
-    db = get_db()
     payload = {
         **record_data,
         "citations": citations,
         "textBlocks": text_blocks,
         "normalizedText": normalized,
         "documentType": doc_type.value,
+        "extractionMode": "streaming" if streaming else "full",
+        "pendingPages": pending_pages,
+        # Workbook tabs in page order, so a block's page can be shown as its sheet
+        "sheetNames": table_result.get("sheet_names", []) if table_result else [],
+        "partial": deadline.partial,
+        "skippedStages": list(deadline.skipped),
+        "templateId": template_id,
+        "templateHit": template_hit,
+        "extractedAt": datetime.utcnow(),
     }
-    await db.extractions.update_one({"fileId": file_id}, {"$set": payload}, upsert=True)
-    await db.files.update_one({"fileId": file_id}, {"$set": {"status": "extracted"}})
+    return record_data, citations, payload
 
-    return record_data, citations
 
+def _merge_llm(field_values: Dict[str, str], suggestions: Dict[str, str]) -> Dict[str, str]:
+    """Copy LLM suggestions into empty fields only; returns what was added."""
+    added = {}
+    for key, value in suggestions.items():
+        if key == "fileId":
+            continue
+        if value and not field_values.get(key):
+            field_values[key] = added[key] = value.strip()
+    return added
+
+
+async def _stream_pdf(
+    file_path: str,
+    text_blocks: List[Dict],
+    full_text_segments: List[str],
+    structured_field_values: Dict[str, str],
+    timer: metrics.StageTimer,
+    report: progress.Reporter,
+    deadline: Deadline,
+) -> List[int]:
+    """Consume pages lazily until the configured fields are covered.
+
+    Each page only runs the regexes for still-missing coverage fields; the full
+    rule pass runs once afterwards over the processed pages, so the result
+    matches full mode on that prefix. Returns the pages left unprocessed,
+    including pages whose OCR did not fit in the deadline.
+    """
+    settings = get_settings()
+    required = settings.stream_coverage_fields
+    found: Dict[str, str] = {}
+    deferred: List[int] = []
+    pages = pdf_service.iter_pages(file_path)
+    try:
+        while True:
+            with timer.stage("pdf_parse"):
+                page = await asyncio.to_thread(next, pages, None)
+            if page is None:
+                return deferred
+            timer.count("pages", 1)
+            report("pdf_parse", page=page.page, pages=page.page_count)
+            page_blocks, page_text = page.blocks, " ".join(page.segments)
+            if page.empty and not deadline.allows(OCR_PAGE_SECONDS):
+                deferred.append(page.page)
+                deadline.skip("ocr")
+                report("deadline", skipped="ocr", page=page.page)
+                continue
+            if page.empty:
+                async with capacity.ocr.slot():
+                    with timer.stage("ocr"):
+                        # Re-checked once the slot is ours: time spent queued for it counts too
+                        ocr_result = await asyncio.to_thread(
+                            ocr_service.ocr_pages,
+                            file_path,
+                            [page.page],
+                            None,
+                            lambda: deadline.allows(OCR_PAGE_SECONDS),
+                        )
+                if ocr_result["skipped_pages"]:
+                    deferred.append(page.page)
+                    deadline.skip("ocr")
+                    report("deadline", skipped="ocr", page=page.page)
+                    continue
+                timer.count("ocr_pages", 1)
+                report("ocr", page=page.page, pages=page.page_count)
+                page_blocks, page_text = ocr_result["blocks"], ocr_result["full_text"]
+            timer.count("text_blocks", len(page_blocks))
+            text_blocks.extend(page_blocks)
+            full_text_segments.append(page_text)
+            if page.table_blocks:
+                timer.count("table_cells", len(page.table_blocks))
+                text_blocks.extend(page.table_blocks)
+                _structured_values(page.table_blocks, structured_field_values)
+                found.update({field: value for field, value in structured_field_values.items() if not found.get(field)})
+
+            with timer.stage("rules"):
+                missing = [field for field in required if not found.get(field)]
+                found.update(rule_based_extract(page_text, missing))
+            if _coverage(found, required) >= settings.stream_coverage_threshold:
+                pending = deferred + list(range(page.page + 1, page.page_count + 1))
+                if pending:
+                    report("coverage_reached", page=page.page, pendingPages=len(pending))
+                return pending
+    finally:
+        pages.close()
+
+
+async def fill_pending_pages(file_id: str, pages: Optional[List[int]] = None) -> Tuple[Dict, List[Dict], List[int]]:
+    """Process pages skipped by streaming mode and fill fields that are still empty.
+
+    Values already on the record, including reviewer edits, are never overwritten.
+    """
+    db = get_db()
+    doc = await db.extractions.find_one({"fileId": file_id}, {"_id": 0})
+    file_doc = await db.files.find_one({"fileId": file_id})
+    if not doc or not file_doc:
+        raise LookupError("Extraction not found")
+
+    pending = doc.get("pendingPages") or []
+    targets = sorted(set(pages) & set(pending)) if pages else list(pending)
+    record_fields = {field: doc.get(field, "") for field in ExtractionRecord.model_fields}
+    if not targets:
+        return record_fields, doc.get("citations", []), pending
+
+    pdf_result = await asyncio.to_thread(pdf_service.extract_pages, file_doc["path"], targets)
+    new_blocks = list(pdf_result.blocks) + pdf_result.table_blocks
+    table_values: Dict[str, str] = {}
+    _structured_values(pdf_result.table_blocks, table_values)
+    if pdf_result.empty_pages:
+        # No deadline here: this is how pages a deadline skipped get finished
+        async with capacity.ocr.slot():
+            ocr_result = await asyncio.to_thread(ocr_service.ocr_pages, file_doc["path"], pdf_result.empty_pages)
+        new_blocks.extend(ocr_result["blocks"])
+
+    # Stable sort keeps the in-page block order while restoring page order
+    text_blocks = sorted(doc.get("textBlocks", []) + new_blocks, key=lambda block: block.get("page") or 0)
+    raw_text = " ".join(block["text"] for block in text_blocks if block.get("source") != "table")
+    filled = {
+        field: value
+        for field, value in {**rule_based_extract(raw_text), **table_values}.items()
+        if value and field in record_fields and not record_fields.get(field)
+    }
+    citations = citation.update_fields(filled, text_blocks, doc.get("citations", []))
+    remaining = [page for page in pending if page not in targets]
+    await db.extractions.update_one(
+        {"fileId": file_id},
+        {
+            "$set": {
+                **filled,
+                "citations": citations,
+                "textBlocks": text_blocks,
+                "normalizedText": normalize_text(raw_text),
+                "pendingPages": remaining,
+                "extractedAt": datetime.utcnow(),
+            }
+        },
+    )
+    await db.files.update_one({"fileId": file_id}, {"$set": file_summary({**record_fields, **filled})})
+    return {**record_fields, **filled}, citations, remaining
+
+
+async def complete_partial(file_id: str) -> Tuple[Dict, List[Dict]]:
+    """Finish the stages a deadline-limited extraction skipped.
+
+    Like ``fill_pending_pages``, only empty fields are filled and missing
+    citations added, so reviewer edits made in the meantime are kept.
+    """
+    db = get_db()
+    doc = await db.extractions.find_one({"fileId": file_id}, {"_id": 0, "skippedStages": 1, "pendingPages": 1})
+    if not doc:
+        raise LookupError("Extraction not found")
+    skipped = doc.get("skippedStages") or []
+    if "ocr" in skipped and doc.get("pendingPages"):
+        await fill_pending_pages(file_id)
+
+    doc = await db.extractions.find_one({"fileId": file_id}, {"_id": 0})
+    record = {field: doc.get(field, "") for field in ExtractionRecord.model_fields}
+    blocks = doc.get("textBlocks", [])
+    citations = doc.get("citations", [])
+    added: Dict[str, str] = {}
+    if "llm" in skipped and _coverage(record) < 0.65:
+        missing = [field for field in ExtractionRecord.model_fields if not record.get(field) and field != "fileId"]
+        added = _merge_llm(record, await infer_with_llama(doc.get("normalizedText", ""), missing))
+        citations = citation.update_fields(added, blocks, citations)
+    if "fuzzy_citations" in skipped:
+        uncited = {
+            entry["field"]: str(record[entry["field"]])
+            for entry in citations
+            if entry.get("page") is None and record.get(entry.get("field"))
+        }
+        citations = citation.update_fields(uncited, blocks, citations)
+
+    now = datetime.utcnow()
+    await db.extractions.update_one(
+        {"fileId": file_id},
+        {
+            "$set": {
+                **added,
+                "citations": citations,
+                "partial": False,
+                "skippedStages": [],
+                "completedAt": now,
+                "extractedAt": now,
+            }
+        },
+    )
+    await db.files.update_one({"fileId": file_id}, {"$set": {"partial": False, **file_summary(record)}})
+    return record, citations
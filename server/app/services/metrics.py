@@ -0,0 +1,156 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(_label_key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelKey, Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            counts, totals = self._series.setdefault(key, ([0] * len(self.buckets), [0.0, 0.0]))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            totals[0] += value
+            totals[1] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, (total, observations)) in sorted(self._series.items()):
+                for bound, bucket_count in zip(self.buckets, counts):
+                    lines.append(f"{self.name}_bucket{_format_labels(key, (('le', str(bound)),))} {bucket_count}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, (('le', '+Inf'),))} {int(observations)}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {int(observations)}")
+        return lines
+
+
+HTTP_REQUEST_SECONDS = Histogram("docextractor_http_request_seconds", "HTTP request latency by route")
+EXTRACTION_SECONDS = Histogram("docextractor_extraction_seconds", "End-to-end run_extraction duration")
+STAGE_SECONDS = Histogram("docextractor_extraction_stage_seconds", "Duration of each extraction stage")
+LLM_SECONDS = Histogram("docextractor_llm_request_seconds", "Ollama /api/generate call latency")
+RENDER_SECONDS = Histogram("docextractor_page_render_seconds", "Page image rendering latency")
+EXTRACTIONS = Counter("docextractor_extractions_total", "Extractions by document type and outcome")
+DOCUMENT_ITEMS = Counter("docextractor_document_items_total", "Pages, text blocks, table cells and OCR pages processed")
+LLM_REQUESTS = Counter("docextractor_llm_requests_total", "Ollama fallback calls by outcome")
+CACHE_REQUESTS = Counter("docextractor_cache_requests_total", "Cache lookups by cache name and result")
+CAPACITY_REJECTIONS = Counter("docextractor_capacity_rejections_total", "Requests turned away because a stage was full")
+SKIPPED_STAGES = Counter("docextractor_deadline_skipped_stages_total", "Extraction stages skipped or degraded to meet the deadline")
+
+REGISTRY = [
+    HTTP_REQUEST_SECONDS,
+    EXTRACTION_SECONDS,
+    STAGE_SECONDS,
+    LLM_SECONDS,
+    RENDER_SECONDS,
+    EXTRACTIONS,
+    DOCUMENT_ITEMS,
+    LLM_REQUESTS,
+    CACHE_REQUESTS,
+    CAPACITY_REJECTIONS,
+    SKIPPED_STAGES,
+]
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def render() -> str:
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class StageTimer:
+    """Collects the per-stage breakdown of one extraction and feeds the shared histograms."""
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed
+            STAGE_SECONDS.observe(elapsed, stage=name)
+
+    def count(self, name: str, value: int) -> None:
+        self.counts[name] = self.counts.get(name, 0) + value
+        DOCUMENT_ITEMS.inc(value, item=name)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._start
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            "totalMs": round(self.elapsed() * 1000, 2),
+            "stagesMs": {name: round(seconds * 1000, 2) for name, seconds in self.stages.items()},
+            "counts": dict(self.counts),
+        }
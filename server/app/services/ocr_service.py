@@ -1,36 +1,54 @@
 from functools import lru_cache
-from typing import List, Dict, Any
+from typing import Callable, List, Dict, Any, Optional
 import easyocr
 import fitz
 import logging
+from app.services import metrics
 
 logger = logging.getLogger(__name__)
 
+# Pages are rendered at this many pixels per point for OCR; boxes are scaled back to page points
+OCR_SCALE = 2.0
+
 
 @lru_cache(maxsize=1)
 def get_reader():
     return easyocr.Reader(["en"], gpu=False)
 
 
-def ocr_pages(path: str, pages: List[int]) -> Dict[str, Any]:
+def ocr_pages(
+    path: str,
+    pages: List[int],
+    progress: Optional[Callable[[int, int], None]] = None,
+    should_continue: Optional[Callable[[], bool]] = None,
+) -> Dict[str, Any]:
+    """OCR ``pages``; when ``should_continue`` returns False the rest are listed in ``skipped_pages``."""
     if not pages:
-        return {"blocks": [], "full_text": ""}
+        return {"blocks": [], "full_text": "", "skipped_pages": []}
 
     try:
         doc = fitz.open(path)
     except Exception as exc:
         logger.error("Unable to open PDF for OCR: %s", exc)
-        return {"blocks": [], "full_text": ""}
+        return {"blocks": [], "full_text": "", "skipped_pages": []}
 
+    cached = get_reader.cache_info().currsize > 0
     reader = get_reader()
+    metrics.record_cache("ocr_reader", cached)
     try:
         blocks: List[Dict[str, Any]] = []
         text_segments: List[str] = []
-        for page_number in pages:
+        skipped_pages: List[int] = []
+        for index, page_number in enumerate(pages):
             if page_number < 1 or page_number > len(doc):
                 continue
+            if should_continue is not None and not should_continue():
+                skipped_pages = list(pages[index:])
+                break
+            if progress:
+                progress(index + 1, len(pages))
             page = doc.load_page(page_number - 1)
-            pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
+            pix = page.get_pixmap(matrix=fitz.Matrix(OCR_SCALE, OCR_SCALE))
             image_bytes = pix.tobytes("png")
             try:
                 results = reader.readtext(image_bytes, detail=1, paragraph=False)
@@ -40,8 +58,9 @@ def ocr_pages(path: str, pages: List[int]) -> Dict[str, Any]:
             for bbox, text, _ in results:
                 if not text.strip():
                     continue
-                xs = [point[0] for point in bbox]
-                ys = [point[1] for point in bbox]
+                # Same coordinate space as digital text blocks, so citations, clips and overlays line up
+                xs = [point[0] / OCR_SCALE for point in bbox]
+                ys = [point[1] / OCR_SCALE for point in bbox]
                 block = {
                     "text": text,
                     "page": page_number,
@@ -55,7 +74,7 @@ def ocr_pages(path: str, pages: List[int]) -> Dict[str, Any]:
                 blocks.append(block)
                 text_segments.append(text)
 
-        return {"blocks": blocks, "full_text": " ".join(text_segments)}
+        return {"blocks": blocks, "full_text": " ".join(text_segments), "skipped_pages": skipped_pages}
     finally:
         doc.close()
 
@@ -1,13 +1,16 @@
-from dataclasses import dataclass, asdict
-from typing import List, Dict, Any
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, List, Dict, Any, Optional, Tuple
+import multiprocessing
+import os
 import fitz
+from app.config import get_settings
+from app.services.excel_service import frame_blocks
 
 
-@dataclass
-class TextBlock:
-    text: str
-    page: int
-    bounds: Dict[str, float]
+# Text-only flags (the "dict" defaults without TEXT_PRESERVE_IMAGES): image blocks and
+# their decoded pixel payloads are never materialized
+TEXT_FLAGS = fitz.TEXTFLAGS_WORDS
 
 
 @dataclass
@@ -15,99 +18,257 @@ class PdfExtractionResult:
     blocks: List[Dict[str, Any]]
     full_text: str
     empty_pages: List[int]
+    page_count: int = 0
+    # Header and cell blocks of tables whose columns map to fields (see excel_service.frame_blocks)
+    table_blocks: List[Dict[str, Any]] = field(default_factory=list)
+
+
+@dataclass
+class PageResult:
+    page: int
+    page_count: int
+    blocks: List[Dict[str, Any]]
+    segments: List[str]
+    empty: bool
+    table_blocks: List[Dict[str, Any]] = field(default_factory=list)
+
 
+PageRange = Tuple[List[Dict[str, Any]], List[str], List[int], List[Dict[str, Any]]]
 
-def extract_text_with_boxes(path: str) -> PdfExtractionResult:
+
+def _block(text: str, page: int, x0: float, y0: float, x1: float, y1: float) -> Dict[str, Any]:
+    # Build the stored shape directly; no intermediate dataclass + asdict() deep copy
+    return {
+        "text": text,
+        "page": page,
+        "bounds": {"x": float(x0), "y": float(y0), "width": float(x1 - x0), "height": float(y1 - y0)},
+    }
+
+
+def _cell_bounds(table: Any) -> Callable[[int, int], Dict[str, float]]:
+    # Row 0 of the frame is the header; when the header is the table's own first
+    # row, to_pandas() leaves it out of the data rows
+    offset = 0 if table.header.external else 1
+
+    def bounds(row_idx: int, col_idx: int) -> Dict[str, float]:
+        row = table.header if row_idx == 0 else table.rows[row_idx - 1 + offset]
+        cell = row.cells[col_idx] if col_idx < len(row.cells) else None
+        x0, y0, x1, y1 = cell or row.bbox
+        return {"x": float(x0), "y": float(y0), "width": float(x1 - x0), "height": float(y1 - y0)}
+
+    return bounds
+
+
+def _extract_tables(page: fitz.Page, page_index: int, table_blocks: List[Dict[str, Any]]) -> None:
+    # The table finder costs ~0.1s per page; pages without vector drawings have no ruled tables
+    if not get_settings().pdf_tables or not page.get_cdrawings():
+        return
+    try:
+        tables = page.find_tables().tables
+    except Exception:
+        # Malformed drawings can break the finder; the page's text blocks still carry its content
+        return
+    for table in tables:
+        try:
+            df = table.to_pandas()
+        except Exception:
+            continue
+        blocks, _, column_to_field = frame_blocks(df, page_index + 1, _cell_bounds(table))
+        if any(column_to_field.values()):
+            # Their text is already in the page's text blocks; the tag keeps it out of rebuilt raw text
+            table_blocks.extend({**block, "source": "table"} for block in blocks)
+
+
+def _extract_page(
+    page: fitz.Page,
+    page_index: int,
+    blocks: List[Dict[str, Any]],
+    empty_pages: List[int],
+    full_text_segments: List[str],
+    table_blocks: Optional[List[Dict[str, Any]]] = None,
+) -> None:
+    if table_blocks is not None:
+        _extract_tables(page, page_index, table_blocks)
+    # "words" tuples (x0, y0, x1, y1, word, block_no, line_no, word_no) carry no font, colour or span
+    # dicts; regrouping them by block_no gives the same paragraph blocks "dict" output would, built
+    # straight into their stored shape
+    words = page.get_text("words", flags=TEXT_FLAGS, sort=False)
+    if not words:
+        empty_pages.append(page_index + 1)
+        return
+
+    block_words: Dict[int, List[tuple]] = {}
+    for word in words:
+        block_words.setdefault(word[5], []).append(word)
+    for members in block_words.values():
+        block_text = " ".join(word[4] for word in members)
+        full_text_segments.append(block_text)
+        blocks.append(
+            _block(
+                block_text,
+                page_index + 1,
+                min(word[0] for word in members),
+                min(word[1] for word in members),
+                max(word[2] for word in members),
+                max(word[3] for word in members),
+            )
+        )
+
+
+def _extract_range(path: str, start: int, stop: int) -> PageRange:
+    """Extract pages ``[start, stop)``; runs inside worker processes, so it opens its own document."""
     doc = fitz.open(path)
     try:
         blocks: List[Dict[str, Any]] = []
         empty_pages: List[int] = []
         full_text_segments: List[str] = []
+        table_blocks: List[Dict[str, Any]] = []
+        for page_index in range(start, stop):
+            _extract_page(doc.load_page(page_index), page_index, blocks, empty_pages, full_text_segments, table_blocks)
+        return blocks, full_text_segments, empty_pages, table_blocks
+    finally:
+        doc.close()
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _worker_count() -> int:
+    return get_settings().pdf_workers or os.cpu_count() or 1
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn, not fork: the API process runs threads (uvicorn, asyncio.to_thread) that fork can deadlock
+        _pool = ProcessPoolExecutor(max_workers=_worker_count(), mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def shutdown() -> None:
+    """Stop the parse workers; called on shutdown so no spawned process outlives the app."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
 
-        for page_index in range(len(doc)):
+
+def _page_ranges(page_count: int, shards: int, min_pages: int = 8) -> List[Tuple[int, int]]:
+    size = max(min_pages, -(-page_count // shards))
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+
+def _extract_parallel(
+    path: str, page_count: int, progress: Optional[Callable[[int, int], None]] = None
+) -> PdfExtractionResult:
+    # Twice as many shards as workers evens out pages of uneven density
+    ranges = _page_ranges(page_count, _worker_count() * 2)
+    pool = _get_pool()
+    futures = {pool.submit(_extract_range, path, start, stop): index for index, (start, stop) in enumerate(ranges)}
+    results: List[Optional[PageRange]] = [None] * len(ranges)
+    pages_done = 0
+    for future in as_completed(futures):
+        index = futures[future]
+        results[index] = future.result()
+        start, stop = ranges[index]
+        pages_done += stop - start
+        if progress:
+            progress(pages_done, page_count)
+
+    # Merge in page order so the output is identical to the sequential walk
+    blocks: List[Dict[str, Any]] = []
+    empty_pages: List[int] = []
+    full_text_segments: List[str] = []
+    table_blocks: List[Dict[str, Any]] = []
+    for range_blocks, range_segments, range_empty, range_tables in results:
+        blocks.extend(range_blocks)
+        full_text_segments.extend(range_segments)
+        empty_pages.extend(range_empty)
+        table_blocks.extend(range_tables)
+    return PdfExtractionResult(
+        blocks=blocks,
+        full_text=" ".join(full_text_segments),
+        empty_pages=empty_pages,
+        page_count=page_count,
+        table_blocks=table_blocks,
+    )
+
+
+def extract_text_with_boxes(
+    path: str,
+    progress: Optional[Callable[[int, int], None]] = None,
+    parallel: Optional[bool] = None,
+) -> PdfExtractionResult:
+    """Extract text blocks with bounding boxes from every page.
+
+    Documents with at least ``pdf_parallel_min_pages`` pages are sharded by page
+    range across worker processes unless ``parallel`` says otherwise.
+    """
+    doc = fitz.open(path)
+    page_count = len(doc)
+    if parallel is None:
+        parallel = page_count >= get_settings().pdf_parallel_min_pages and _worker_count() > 1
+    if parallel:
+        doc.close()
+        return _extract_parallel(path, page_count, progress)
+
+    try:
+        blocks: List[Dict[str, Any]] = []
+        empty_pages: List[int] = []
+        full_text_segments: List[str] = []
+        table_blocks: List[Dict[str, Any]] = []
+
+        for page_index in range(page_count):
+            if progress:
+                progress(page_index + 1, page_count)
             page = doc.load_page(page_index)
-            
-            # Try to get text blocks (paragraphs/sentences) first for better context
-            text_dict = page.get_text("dict")
-            if not text_dict.get("blocks"):
-                # Fallback to words if blocks are not available
-                words = page.get_text("words")
-                if not words:
-                    empty_pages.append(page_index + 1)
-                    continue
-                
-                # Group words into lines for better context
-                lines: Dict[float, List[tuple]] = {}
-                for word in words:
-                    x0, y0, x1, y1, text, *_ = word
-                    if not text.strip():
-                        continue
-                    # Group by y-coordinate (same line)
-                    y_center = (y0 + y1) / 2
-                    line_key = round(y_center / 5) * 5  # Round to nearest 5 pixels
-                    if line_key not in lines:
-                        lines[line_key] = []
-                    lines[line_key].append((x0, y0, x1, y1, text))
-                
-                # Create blocks from lines
-                for y_key in sorted(lines.keys()):
-                    line_words = sorted(lines[y_key], key=lambda w: w[0])  # Sort by x position
-                    if not line_words:
-                        continue
-                    
-                    line_text = " ".join(w[4] for w in line_words)
-                    full_text_segments.append(line_text)
-                    
-                    # Calculate bounding box for the entire line
-                    min_x = min(w[0] for w in line_words)
-                    min_y = min(w[1] for w in line_words)
-                    max_x = max(w[2] for w in line_words)
-                    max_y = max(w[3] for w in line_words)
-                    
-                    block = TextBlock(
-                        text=line_text,
-                        page=page_index + 1,
-                        bounds={"x": float(min_x), "y": float(min_y), "width": float(max_x - min_x), "height": float(max_y - min_y)},
-                    )
-                    blocks.append(asdict(block))
-            else:
-                # Use text blocks (better for structured documents)
-                for block_dict in text_dict["blocks"]:
-                    if "lines" not in block_dict:
-                        continue
-                    
-                    block_text_parts = []
-                    min_x, min_y, max_x, max_y = float('inf'), float('inf'), 0, 0
-                    
-                    for line in block_dict["lines"]:
-                        line_text_parts = []
-                        for span in line.get("spans", []):
-                            span_text = span.get("text", "").strip()
-                            if span_text:
-                                line_text_parts.append(span_text)
-                                bbox = span.get("bbox", [])
-                                if len(bbox) == 4:
-                                    min_x = min(min_x, bbox[0])
-                                    min_y = min(min_y, bbox[1])
-                                    max_x = max(max_x, bbox[2])
-                                    max_y = max(max_y, bbox[3])
-                        
-                        if line_text_parts:
-                            line_text = " ".join(line_text_parts)
-                            block_text_parts.append(line_text)
-                    
-                    if block_text_parts and min_x != float('inf'):
-                        block_text = " ".join(block_text_parts)
-                        full_text_segments.append(block_text)
-                        
-                        block = TextBlock(
-                            text=block_text,
-                            page=page_index + 1,
-                            bounds={"x": float(min_x), "y": float(min_y), "width": float(max_x - min_x), "height": float(max_y - min_y)},
-                        )
-                        blocks.append(asdict(block))
-
-        return PdfExtractionResult(blocks=blocks, full_text=" ".join(full_text_segments), empty_pages=empty_pages)
+            _extract_page(page, page_index, blocks, empty_pages, full_text_segments, table_blocks)
+
+        return PdfExtractionResult(
+            blocks=blocks,
+            full_text=" ".join(full_text_segments),
+            empty_pages=empty_pages,
+            page_count=page_count,
+            table_blocks=table_blocks,
+        )
+    finally:
+        doc.close()
+
+
+def iter_pages(path: str) -> Iterator[PageResult]:
+    """Lazily yield one page at a time so callers can stop early; close the generator to release the file."""
+    doc = fitz.open(path)
+    try:
+        page_count = len(doc)
+        for page_index in range(page_count):
+            blocks: List[Dict[str, Any]] = []
+            empty_pages: List[int] = []
+            segments: List[str] = []
+            table_blocks: List[Dict[str, Any]] = []
+            _extract_page(doc.load_page(page_index), page_index, blocks, empty_pages, segments, table_blocks)
+            yield PageResult(page_index + 1, page_count, blocks, segments, bool(empty_pages), table_blocks)
     finally:
         doc.close()
 
+
+def extract_pages(path: str, pages: List[int]) -> PdfExtractionResult:
+    """Extract only the given 1-based pages, in the order given."""
+    doc = fitz.open(path)
+    try:
+        blocks: List[Dict[str, Any]] = []
+        empty_pages: List[int] = []
+        full_text_segments: List[str] = []
+        table_blocks: List[Dict[str, Any]] = []
+        for page_number in pages:
+            if 1 <= page_number <= len(doc):
+                page = doc.load_page(page_number - 1)
+                _extract_page(page, page_number - 1, blocks, empty_pages, full_text_segments, table_blocks)
+        return PdfExtractionResult(
+            blocks=blocks,
+            full_text=" ".join(full_text_segments),
+            empty_pages=empty_pages,
+            page_count=len(doc),
+            table_blocks=table_blocks,
+        )
+    finally:
+        doc.close()
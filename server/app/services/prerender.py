@@ -0,0 +1,83 @@
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional
+import logging
+import multiprocessing
+import os
+import fitz
+from app.config import get_settings
+from app.services import storage
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def _lower_priority() -> None:
+    # Worker processes run at the lowest CPU priority so extraction always wins the core
+    try:
+        os.nice(19)
+    except (AttributeError, OSError):
+        pass
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=max(1, get_settings().prerender_workers),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_lower_priority,
+        )
+    return _executor
+
+
+def shutdown() -> None:
+    """Drop queued renders and wait for the ones already running, so no half-written cache files are left."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+
+
+def _prerender(file_path: str, full_pages: List[int], thumbnails: bool) -> Dict[str, int]:
+    settings = get_settings()
+    written = {"page": storage.render_to_cache(file_path, full_pages, "page", storage.PAGE_SCALE)}
+    if thumbnails:
+        doc = fitz.open(file_path)
+        try:
+            page_count = len(doc)
+        finally:
+            doc.close()
+        written["thumb"] = storage.render_to_cache(
+            file_path, range(1, page_count + 1), "thumb", settings.thumbnail_scale
+        )
+    return written
+
+
+def _log_result(file_path: str, future: Future) -> None:
+    exc = future.exception()
+    if exc is not None:
+        logger.warning("Pre-rendering %s failed: %s", file_path, exc)
+    else:
+        logger.debug("Pre-rendered %s: %s", file_path, future.result())
+
+
+def schedule(file_path: str, full_pages: Iterable[int], thumbnails: bool = False) -> Optional[Future]:
+    """Queue low-priority rendering into the page cache; no-op for non-PDFs or when disabled."""
+    if not get_settings().prerender_enabled or not file_path.lower().endswith(".pdf"):
+        return None
+    future = _get_executor().submit(_prerender, file_path, sorted(set(full_pages)), thumbnails)
+    future.add_done_callback(lambda done: _log_result(file_path, done))
+    return future
+
+
+def schedule_after_upload(file_path: str) -> Optional[Future]:
+    first_pages = range(1, get_settings().prerender_first_pages + 1)
+    return schedule(file_path, first_pages, thumbnails=True)
+
+
+def schedule_cited_pages(file_path: str, citations: List[Dict]) -> Optional[Future]:
+    pages = [c["page"] for c in citations if isinstance(c.get("page"), int)]
+    if not pages:
+        return None
+    return schedule(file_path, pages)
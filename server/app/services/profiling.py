@@ -0,0 +1,185 @@
+import cProfile
+import hmac
+import io
+import json
+import logging
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter as TallyCounter
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Dict, Optional, TypeVar
+from fastapi import HTTPException, Request
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+PROFILE_HEADER = "X-Profile"
+ADMIN_HEADER = "X-Admin-Token"
+SHARED_DIR = "_profiles"
+# fileIds reach here from request paths and bodies; anything else ("..") must not pick the directory
+SAFE_FILE_ID = re.compile(r"[A-Za-z0-9_-]+")
+
+
+@dataclass
+class ProfileSession:
+    label: str
+    file_id: Optional[str] = None
+    # Stage timings of the extraction run under this profile (see record_timings)
+    timings: Optional[Dict[str, Any]] = None
+
+
+_current_session: ContextVar[Optional[ProfileSession]] = ContextVar("profile_session", default=None)
+
+
+def is_admin(request: Request) -> bool:
+    expected = get_settings().admin_token
+    supplied = request.headers.get(ADMIN_HEADER, "")
+    return bool(expected) and hmac.compare_digest(supplied, expected)
+
+
+def require_admin(request: Request) -> None:
+    if not is_admin(request):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+def wants_profile(request: Request) -> bool:
+    if get_settings().profiling_mode == "off":
+        return False
+    if request.headers.get(PROFILE_HEADER, "").lower() not in {"1", "true", "yes"}:
+        return False
+    return is_admin(request)
+
+
+def bind_file(file_id: str) -> None:
+    """Attach the active profile (if any) to an upload so its dump lands in ``uploads/<fileId>/``."""
+    session = _current_session.get()
+    if session is not None and session.file_id is None:
+        session.file_id = file_id
+
+
+def record_timings(timings: Dict[str, Any]) -> None:
+    """Attach an extraction's stage timings to the active profile; they are written next to the dump.
+
+    cProfile only sees the event-loop thread, so PDF parsing and OCR (threads and
+    process pools) show up in the dump as awaits; the timings show where that time went.
+    """
+    session = _current_session.get()
+    if session is not None:
+        session.timings = timings
+
+
+def _output_dir(file_id: Optional[str]) -> Path:
+    base = Path(get_settings().uploads_dir)
+    safe = file_id is not None and SAFE_FILE_ID.fullmatch(file_id) is not None
+    target = base / file_id / "profiles" if safe else base / SHARED_DIR
+    target.mkdir(parents=True, exist_ok=True)
+    return target
+
+
+def write_profile(
+    profiler: cProfile.Profile, label: str, file_id: Optional[str], timings: Optional[Dict[str, Any]] = None
+) -> Path:
+    """Save ``<label>-<timestamp>.prof`` plus a top-N cumulative-time text summary and any stage timings."""
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+    safe_label = "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in label).strip("_") or "request"
+    target = _output_dir(file_id) / f"{safe_label}-{stamp}.prof"
+    profiler.dump_stats(str(target))
+
+    summary = io.StringIO()
+    stats = pstats.Stats(profiler, stream=summary)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(get_settings().profile_top_n)
+    target.with_suffix(".txt").write_text(summary.getvalue())
+    if timings:
+        target.with_suffix(".timings.json").write_text(json.dumps(timings, indent=2, default=str))
+    logger.info("Profile written to %s", target)
+    return target
+
+
+async def profile_request(request: Request, call_next):
+    """Run one request under cProfile.
+
+    cProfile hooks the whole thread, so other requests interleaved on the event
+    loop during this one are included in the dump; profile on a quiet worker.
+    Work in threads and process pools is not in the dump; see record_timings.
+    """
+    session = ProfileSession(label=f"{request.method}-{request.url.path}")
+    token = _current_session.set(session)
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        response = await call_next(request)
+    finally:
+        profiler.disable()
+        _current_session.reset(token)
+    file_id = session.file_id or request.scope.get("path_params", {}).get("file_id")
+    path = write_profile(profiler, session.label, file_id, session.timings)
+    response.headers["X-Profile-Path"] = str(path)
+    return response
+
+
+async def run_profiled(file_id: str, label: str, job: Awaitable[T]) -> T:
+    """Await an extraction job, profiling it when ``PROFILING_MODE=always``."""
+    if get_settings().profiling_mode != "always" or _current_session.get() is not None:
+        return await job
+    session = ProfileSession(label=label, file_id=file_id)
+    token = _current_session.set(session)
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return await job
+    finally:
+        profiler.disable()
+        _current_session.reset(token)
+        write_profile(profiler, label, file_id, session.timings)
+
+
+def _frame_key(frame) -> str:
+    code = frame.f_code
+    return f"{Path(code.co_filename).name}:{code.co_name}:{frame.f_lineno}"
+
+
+def sample_stacks(duration: float, interval: float = 0.005, max_depth: int = 64) -> Dict[str, object]:
+    """Sample every thread's Python stack without tracing, for use on a live worker.
+
+    Returns folded stacks (flamegraph.pl / speedscope format) and the frames that
+    were on top of the stack most often.
+    """
+    own_id = threading.get_ident()
+    folded: TallyCounter = TallyCounter()
+    leaf: TallyCounter = TallyCounter()
+    samples = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            stack = []
+            while frame is not None and len(stack) < max_depth:
+                stack.append(_frame_key(frame))
+                frame = frame.f_back
+            if not stack:
+                continue
+            leaf[stack[0]] += 1
+            folded[";".join(reversed(stack))] += 1
+        samples += 1
+        time.sleep(interval)
+
+    return {
+        "samples": samples,
+        "folded": "\n".join(f"{stack} {count}" for stack, count in folded.most_common()),
+        "top": [{"frame": frame, "samples": count} for frame, count in leaf.most_common(get_settings().profile_top_n)],
+    }
+
+
+def write_samples(result: Dict[str, object]) -> Path:
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+    target = _output_dir(None) / f"sample-{stamp}.folded"
+    target.write_text(str(result["folded"]))
+    return target
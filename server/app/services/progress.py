@@ -0,0 +1,84 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Set
+
+HISTORY_SIZE = 200
+SUBSCRIBER_QUEUE_SIZE = 100
+# How long finished runs keep their history for late subscribers
+RETAIN_SECONDS = 300.0
+TERMINAL_STAGES = {"completed", "failed"}
+
+Reporter = Callable[..., None]
+
+
+class ProgressBroker:
+    """In-process pub/sub of extraction progress keyed by fileId.
+
+    Every buffer is bounded: history keeps the last ``HISTORY_SIZE`` events per
+    file and a slow subscriber loses its oldest queued events rather than
+    growing without limit.
+    """
+
+    def __init__(self, history_size: int = HISTORY_SIZE, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.history_size = history_size
+        self.queue_size = queue_size
+        self._history: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._expiry: Dict[str, asyncio.TimerHandle] = {}
+
+    def _deliver(self, file_id: str, event: Dict[str, Any]) -> None:
+        if file_id in self._expiry:
+            self._expiry.pop(file_id).cancel()
+        if event["stage"] == "started":
+            # A new run replaces the previous one's history, so late subscribers never replay its terminal event
+            self._history.pop(file_id, None)
+        history = self._history.setdefault(file_id, deque(maxlen=self.history_size))
+        history.append(event)
+        for queue in self._subscribers.get(file_id, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+        if event["stage"] in TERMINAL_STAGES:
+            loop = asyncio.get_running_loop()
+            self._expiry[file_id] = loop.call_later(RETAIN_SECONDS, self._expire, file_id)
+
+    def _expire(self, file_id: str) -> None:
+        self._expiry.pop(file_id, None)
+        self._history.pop(file_id, None)
+
+    def publish(self, file_id: str, stage: str, **data: Any) -> None:
+        """Publish from the event loop thread."""
+        self._deliver(file_id, {"fileId": file_id, "stage": stage, "ts": time.time(), **data})
+
+    def reporter(self, file_id: str) -> Reporter:
+        """Return a ``report(stage, **data)`` callable that is safe to use from worker threads."""
+        loop = asyncio.get_running_loop()
+
+        def report(stage: str, **data: Any) -> None:
+            event = {"fileId": file_id, "stage": stage, "ts": time.time(), **data}
+            loop.call_soon_threadsafe(self._deliver, file_id, event)
+
+        return report
+
+    def subscribe(self, file_id: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        for event in list(self._history.get(file_id, ()))[-self.queue_size:]:
+            queue.put_nowait(event)
+        self._subscribers.setdefault(file_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, file_id: str, queue: asyncio.Queue) -> None:
+        subscribers = self._subscribers.get(file_id)
+        if subscribers is None:
+            return
+        subscribers.discard(queue)
+        if not subscribers:
+            self._subscribers.pop(file_id, None)
+
+    def last_event(self, file_id: str) -> Optional[Dict[str, Any]]:
+        history = self._history.get(file_id)
+        return history[-1] if history else None
+
+
+broker = ProgressBroker()
@@ -0,0 +1,159 @@
+import asyncio
+import os
+import socket
+import traceback
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from app.config import get_settings
+from app.db import get_db
+from app.schemas.extraction import ExtractionRecord
+from app.services import capacity, extractor, profiling
+from app.services.deadline import Deadline
+
+POLL_SECONDS = 0.5
+OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+Result = Tuple[Dict[str, Any], List[Dict[str, Any]]]
+
+_inflight: Dict[str, asyncio.Future] = {}
+
+
+class ExtractionFailed(RuntimeError):
+    pass
+
+
+class _LeaderCancelled(Exception):
+    """Set on the shared future when the leading caller goes away, so a joiner takes over."""
+
+
+async def stored_result(file_id: str) -> Optional[Result]:
+    doc = await get_db().extractions.find_one({"fileId": file_id}, {"_id": 0, "textBlocks": 0, "normalizedText": 0})
+    if not doc:
+        return None
+    record = {field: doc.get(field, "") for field in ExtractionRecord.model_fields}
+    return record, doc.get("citations", [])
+
+
+async def _claim(file_id: str, force: bool) -> Optional[Dict[str, Any]]:
+    """Move the file to ``extracting`` unless another process holds a fresh lock on it.
+
+    Returns the file document as it was before the transition, or None when the
+    lock is taken (or, without ``force``, the file is already extracted).
+    """
+    now = datetime.utcnow()
+    stale_before = now - timedelta(seconds=get_settings().extraction_lock_seconds)
+    idle_statuses = {"status": {"$ne": "extracting"}} if force else {"status": {"$nin": ["extracting", "extracted"]}}
+    return await get_db().files.find_one_and_update(
+        {
+            "fileId": file_id,
+            "$or": [
+                idle_statuses,
+                # A crashed holder never releases its lock; take it over once it is stale
+                {"status": "extracting", "extractionStartedAt": {"$lt": stale_before}},
+                {"status": "extracting", "extractionStartedAt": {"$exists": False}},
+            ],
+        },
+        {"$set": {"status": "extracting", "extractionStartedAt": now, "extractionOwner": OWNER}},
+        projection={"_id": 0},
+    )
+
+
+async def _run(file_doc: Dict[str, Any], label: str, deadline: Optional[Deadline]) -> Result:
+    db = get_db()
+    file_id = file_doc["fileId"]
+    try:
+        return await profiling.run_profiled(file_id, label, extractor.run_extraction(file_doc, deadline))
+    except asyncio.CancelledError:
+        # Release the lock so the next caller does not wait for it to go stale
+        await db.files.update_one({"fileId": file_id}, {"$set": {"status": file_doc.get("status", "uploaded")}})
+        raise
+    except Exception as exc:
+        await db.files.update_one(
+            {"fileId": file_id},
+            {"$set": {"status": "failed", "error": str(exc), "traceback": traceback.format_exc()}},
+        )
+        raise
+
+
+def _is_stale(file_doc: Dict[str, Any]) -> bool:
+    started = file_doc.get("extractionStartedAt")
+    limit = timedelta(seconds=get_settings().extraction_lock_seconds)
+    return started is None or datetime.utcnow() - started > limit
+
+
+async def _claim_or_wait(file_id: str, force: bool, label: str, deadline: Optional[Deadline]) -> Result:
+    db = get_db()
+    while True:
+        previous = await _claim(file_id, force)
+        if previous is not None:
+            return await _run(previous, label, deadline)
+
+        # Another process owns the extraction (or the file is done): follow the files record
+        while True:
+            current = await db.files.find_one(
+                {"fileId": file_id}, {"_id": 0, "status": 1, "error": 1, "extractionStartedAt": 1}
+            )
+            if current is None:
+                raise LookupError("File not found")
+            if current.get("status") != "extracting" or _is_stale(current):
+                break
+            await asyncio.sleep(POLL_SECONDS)
+
+        if current["status"] == "extracted":
+            result = await stored_result(file_id)
+            if result is not None:
+                return result
+            # Marked extracted but the result is gone; extract it again
+            force = True
+        elif current["status"] == "failed":
+            raise ExtractionFailed(current.get("error") or "Extraction failed")
+
+
+async def extract(
+    file_doc: Dict[str, Any],
+    force: bool = False,
+    label: str = "extract",
+    deadline: Optional[Deadline] = None,
+    limiter: Optional[capacity.StageLimiter] = None,
+) -> Result:
+    """Run the extraction of one file at most once at a time, returning stored results when possible.
+
+    Callers in this process share one future per fileId; callers in other
+    processes are serialised by an atomic status transition on ``files``.
+    Only the caller that runs the extraction takes a ``limiter`` slot; the
+    others just wait on its future.
+    """
+    file_id = file_doc["fileId"]
+    if not force and file_doc.get("status") == "extracted":
+        result = await stored_result(file_id)
+        if result is not None:
+            return result
+
+    while file_id in _inflight:
+        try:
+            return await asyncio.shield(_inflight[file_id])
+        except _LeaderCancelled:
+            # The leader's request was dropped; the first joiner to wake up leads the retry
+            continue
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[file_id] = future
+    try:
+        if limiter is None:
+            result = await _claim_or_wait(file_id, force, label, deadline)
+        else:
+            async with limiter.slot():
+                result = await _claim_or_wait(file_id, force, label, deadline)
+    except asyncio.CancelledError:
+        future.set_exception(_LeaderCancelled())
+        future.exception()
+        raise
+    except Exception as exc:
+        future.set_exception(exc)
+        # Mark the exception retrieved so an unjoined future does not log a warning
+        future.exception()
+        raise
+    finally:
+        _inflight.pop(file_id, None)
+    future.set_result(result)
+    return result
@@ -1,7 +1,10 @@
 from pathlib import Path
+from typing import Iterable
+from uuid import uuid4
 import fitz
 from fastapi import UploadFile, HTTPException
 from app.config import get_settings
+from app.services import metrics
 
 settings = get_settings()
 BASE_DIR = Path(settings.uploads_dir)
@@ -20,14 +23,131 @@ async def save_file(file_id: str, upload: UploadFile) -> str:
     return str(target_path)
 
 
+TILE_SIZE = 256
+MAX_TILE_ZOOM = 5
+MAX_CLIP_SCALE = 8.0
+PAGE_SCALE = 2.0
+PAGE_CACHE_DIR = "pages"
+
+
+def _load_page(doc: fitz.Document, page_number: int) -> fitz.Page:
+    if page_number < 1 or page_number > len(doc):
+        raise HTTPException(status_code=404, detail="Page not found")
+    return doc.load_page(page_number - 1)
+
+
+def page_cache_path(file_path: str, page_number: int, variant: str = "page") -> Path:
+    """Rendered PNGs live next to the upload: ``uploads/<fileId>/pages/<variant>-<page>.png``."""
+    return Path(file_path).parent / PAGE_CACHE_DIR / f"{variant}-{page_number}.png"
+
+
+def _write_cache(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Write-then-rename so a concurrent reader never sees a half-written PNG
+    tmp_path = path.with_name(f".{path.name}.{uuid4().hex}.tmp")
+    tmp_path.write_bytes(data)
+    tmp_path.replace(path)
+
+
+def render_to_cache(file_path: str, pages: Iterable[int], variant: str, scale: float) -> int:
+    """Render pages that are not cached yet; returns how many were written."""
+    written = 0
+    doc = fitz.open(file_path)
+    try:
+        for page_number in pages:
+            target = page_cache_path(file_path, page_number, variant)
+            if target.exists() or page_number < 1 or page_number > len(doc):
+                continue
+            pix = doc.load_page(page_number - 1).get_pixmap(matrix=fitz.Matrix(scale, scale))
+            _write_cache(target, pix.tobytes("png"))
+            written += 1
+        return written
+    finally:
+        doc.close()
+
+
+async def _cached_render(file_path: str, page_number: int, variant: str, scale: float) -> bytes:
+    cached = page_cache_path(file_path, page_number, variant)
+    if cached.exists():
+        metrics.record_cache(f"{variant}_image", True)
+        return cached.read_bytes()
+    metrics.record_cache(f"{variant}_image", False)
+
+    doc = fitz.open(file_path)
+    try:
+        page = _load_page(doc, page_number)
+        with metrics.RENDER_SECONDS.time(kind=variant):
+            data = page.get_pixmap(matrix=fitz.Matrix(scale, scale)).tobytes("png")
+    finally:
+        doc.close()
+    _write_cache(cached, data)
+    return data
+
+
 async def render_page_image(file_path: str, page_number: int):
+    return await _cached_render(file_path, page_number, "page", PAGE_SCALE)
+
+
+async def render_thumbnail(file_path: str, page_number: int):
+    return await _cached_render(file_path, page_number, "thumb", settings.thumbnail_scale)
+
+
+async def render_clip(file_path: str, page_number: int, bounds: dict, scale: float, padding: float = 0.0):
+    """Render only ``bounds`` (page points, shaped like citation bounds) at ``scale`` pixels per point."""
+    rect = fitz.Rect(
+        bounds["x"] - padding,
+        bounds["y"] - padding,
+        bounds["x"] + bounds["width"] + padding,
+        bounds["y"] + bounds["height"] + padding,
+    )
+    doc = fitz.open(file_path)
+    try:
+        page = _load_page(doc, page_number)
+        clip = rect & page.rect
+        if clip.is_empty:
+            raise HTTPException(status_code=400, detail="Clip rectangle is outside the page")
+        with metrics.RENDER_SECONDS.time(kind="clip"):
+            pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), clip=clip)
+            return pix.tobytes("png")
+    finally:
+        doc.close()
+
+
+def tile_grid(file_path: str, page_number: int) -> dict:
+    doc = fitz.open(file_path)
+    try:
+        rect = _load_page(doc, page_number).rect
+        return {
+            "width": rect.width,
+            "height": rect.height,
+            "tileSize": TILE_SIZE,
+            "maxZoom": MAX_TILE_ZOOM,
+        }
+    finally:
+        doc.close()
+
+
+async def render_tile(file_path: str, page_number: int, zoom: int, tile_x: int, tile_y: int):
+    """Render one TILE_SIZE px square of the page at 2**zoom pixels per point (slippy-map z/x/y)."""
+    if zoom < 0 or zoom > MAX_TILE_ZOOM or tile_x < 0 or tile_y < 0:
+        raise HTTPException(status_code=404, detail="Tile not found")
+    scale = 2 ** zoom
+    span = TILE_SIZE / scale  # tile edge length in page points
     doc = fitz.open(file_path)
     try:
-        if page_number < 1 or page_number > len(doc):
-            raise HTTPException(status_code=404, detail="Page not found")
-        page = doc.load_page(page_number - 1)
-        pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
-        return pix.tobytes("png")
+        page = _load_page(doc, page_number)
+        origin = page.rect.tl
+        clip = fitz.Rect(
+            origin.x + tile_x * span,
+            origin.y + tile_y * span,
+            origin.x + (tile_x + 1) * span,
+            origin.y + (tile_y + 1) * span,
+        ) & page.rect
+        if clip.is_empty:
+            raise HTTPException(status_code=404, detail="Tile not found")
+        with metrics.RENDER_SECONDS.time(kind="tile"):
+            pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), clip=clip)
+            return pix.tobytes("png")
     finally:
         doc.close()
 
@@ -0,0 +1,324 @@
+import hashlib
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from uuid import uuid4
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from app.config import get_settings
+from app.db import get_db
+
+# Layout fingerprints only look at the first pages, where carriers put their fixed header labels
+TEMPLATE_PAGES = 2
+# Block origins are snapped to this grid (PDF points) before comparing layouts
+GRID = 10.0
+MATCH_THRESHOLD = 0.8
+# Fingerprints with fewer labels than this are too generic to identify a layout
+MIN_LABELS = 5
+REGION_TOLERANCE = 12.0
+MAX_VALUE_TOKENS = 12
+CACHE_SECONDS = 30.0
+
+Cleaner = Callable[[str, str], str]
+
+_cache: Optional[List[Dict[str, Any]]] = None
+_cache_loaded_at = 0.0
+
+
+@dataclass
+class TemplateMatch:
+    template: Dict[str, Any]
+    score: float
+    labels: List[str]
+    values: Dict[str, str] = field(default_factory=dict)
+    citations: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def template_id(self) -> str:
+        return self.template["templateId"]
+
+
+def _label(text: str) -> Optional[str]:
+    # "Policy Number: POL-1" contributes its label part; free text with digits is treated as a value
+    label = text.split(":", 1)[0] if ":" in text else text
+    label = re.sub(r"\s+", " ", label).strip().lower()
+    if not label or re.search(r"\d", label) or not re.search(r"[a-z]", label) or len(label.split()) > 4:
+        return None
+    return label
+
+
+def fingerprint(blocks: List[Dict[str, Any]]) -> List[str]:
+    labels = set()
+    for block in blocks:
+        page = block.get("page") or 0
+        if page > TEMPLATE_PAGES or not block.get("bounds"):
+            continue
+        label = _label(block.get("text", ""))
+        if label is None:
+            continue
+        bounds = block["bounds"]
+        labels.add(f"{page}:{round(bounds['x'] / GRID)}:{round(bounds['y'] / GRID)}:{label}")
+    return sorted(labels)
+
+
+def _similarity(left: List[str], right: List[str]) -> float:
+    a, b = set(left), set(right)
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+async def _templates() -> List[Dict[str, Any]]:
+    global _cache, _cache_loaded_at
+    if _cache is None or time.monotonic() - _cache_loaded_at > CACHE_SECONDS:
+        _cache = await get_db().templates.find({}, {"_id": 0}).to_list(None)
+        _cache_loaded_at = time.monotonic()
+    return _cache
+
+
+def _invalidate() -> None:
+    global _cache
+    _cache = None
+
+
+async def match(blocks: List[Dict[str, Any]]) -> Tuple[Optional[TemplateMatch], List[str]]:
+    """Find the stored template whose label layout is closest to ``blocks``; also returns the fingerprint."""
+    labels = fingerprint(blocks)
+    if len(labels) < MIN_LABELS:
+        return None, labels
+    best: Optional[TemplateMatch] = None
+    for template in await _templates():
+        score = _similarity(labels, template["labels"])
+        if score >= MATCH_THRESHOLD and (best is None or score > best.score):
+            best = TemplateMatch(template=template, score=score, labels=labels)
+    return best, labels
+
+
+def _tokens(text: str) -> List[str]:
+    return text.split()
+
+
+def _is_label_token(token: str) -> bool:
+    return not re.search(r"\d", token)
+
+
+def _locate(snippet: str, value: str, field_name: str, clean: Cleaner) -> Optional[Dict[str, Any]]:
+    """Describe where ``value`` sits in ``snippet`` relative to its neighbouring tokens.
+
+    The value is anchored on the token just before it (usually its label, e.g.
+    ``carrier:``) and which occurrence of that token it is; ``stop`` is the
+    label token that ends it, so values of a different length still line up.
+    """
+    tokens = [token.lower() for token in _tokens(snippet)]
+    for start in range(len(tokens)):
+        for end in range(start + 1, min(len(tokens), start + MAX_VALUE_TOKENS) + 1):
+            if clean(field_name, " ".join(_tokens(snippet)[start:end])) != value:
+                continue
+            anchor = tokens[start - 1] if start else None
+            following = tokens[end] if end < len(tokens) else None
+            return {
+                "anchor": anchor,
+                "occurrence": tokens[: start - 1].count(anchor) if anchor else 0,
+                "stop": following if following and _is_label_token(following) else None,
+                "tokens": end - start,
+                "bounded": following is not None,
+            }
+    return None
+
+
+def _value_from(block: Dict[str, Any], region: Dict[str, Any], field_name: str, clean: Cleaner) -> Optional[str]:
+    original = _tokens(block.get("text", ""))
+    tokens = [token.lower() for token in original]
+    start = 0
+    if region["anchor"]:
+        positions = [index for index, token in enumerate(tokens) if token == region["anchor"]]
+        if len(positions) <= region["occurrence"]:
+            return None
+        start = positions[region["occurrence"]] + 1
+    end = min(len(tokens), start + MAX_VALUE_TOKENS)
+    if region["stop"]:
+        if region["stop"] not in tokens[start:end]:
+            return None
+        end = tokens.index(region["stop"], start, end)
+    elif region["bounded"]:
+        end = min(end, start + region["tokens"])
+    value = clean(field_name, " ".join(original[start:end])) if end > start else ""
+    return value or None
+
+
+def _near(bounds: Dict[str, float], region: Dict[str, Any]) -> Optional[float]:
+    dy = abs(bounds["y"] - region["y"])
+    if dy > REGION_TOLERANCE:
+        return None
+    # Left-aligned values keep their x origin, right-aligned amounts keep their right edge
+    left = abs(bounds["x"] - region["x"])
+    right = abs(bounds["x"] + bounds["width"] - region["x"] - region["width"])
+    if min(left, right) > REGION_TOLERANCE:
+        return None
+    return dy + min(left, right)
+
+
+def _lookup(
+    region: Dict[str, Any], by_page: Dict[int, List[Dict[str, Any]]], field_name: str, clean: Cleaner
+) -> Optional[Tuple[str, Dict[str, Any]]]:
+    best: Optional[Tuple[float, str, Dict[str, Any]]] = None
+    for block in by_page.get(region["page"], ()):
+        distance = _near(block["bounds"], region)
+        if distance is None or (best is not None and distance >= best[0]):
+            continue
+        value = _value_from(block, region, field_name, clean)
+        if value is not None:
+            best = (distance, value, block)
+    return (best[1], best[2]) if best else None
+
+
+def _by_page(blocks: List[Dict[str, Any]]) -> Dict[int, List[Dict[str, Any]]]:
+    pages: Dict[int, List[Dict[str, Any]]] = {}
+    for block in blocks:
+        if block.get("bounds"):
+            pages.setdefault(block.get("page") or 0, []).append(block)
+    return pages
+
+
+def _confirmed(region: Dict[str, Any]) -> bool:
+    return region.get("confirmations", 0) >= get_settings().template_min_confirmations
+
+
+def apply(found: TemplateMatch, blocks: List[Dict[str, Any]], clean: Cleaner) -> bool:
+    """Fill ``found.values``/``citations`` for the template's confirmed fields by spatial lookup.
+
+    Returns False (and leaves nothing filled) when no field is confirmed yet or
+    a confirmed field cannot be found, i.e. the document only looks like the
+    template. Fields that are not confirmed are left to the caller.
+    """
+    confirmed = {name: region for name, region in found.template.get("fields", {}).items() if _confirmed(region)}
+    if not confirmed:
+        return False
+    by_page = _by_page(blocks)
+    for field_name, region in confirmed.items():
+        hit = _lookup(region, by_page, field_name, clean)
+        if hit is None:
+            found.values, found.citations = {}, []
+            return False
+        value, block = hit
+        found.values[field_name] = value
+        found.citations.append(
+            {"field": field_name, "page": block["page"], "bounds": block["bounds"], "snippet": block["text"]}
+        )
+    return True
+
+
+def _region(citation: Dict[str, Any], value: str, field_name: str, clean: Cleaner) -> Optional[Dict[str, Any]]:
+    if not citation.get("page") or not citation.get("bounds") or not citation.get("snippet"):
+        return None
+    located = _locate(citation["snippet"], value, field_name, clean)
+    if located is None:
+        return None
+    return {"page": citation["page"], **citation["bounds"], **located, "confirmations": 0, "misses": 0}
+
+
+def _layout_key(labels: List[str]) -> str:
+    return hashlib.sha1("\n".join(labels).encode("utf-8")).hexdigest()
+
+
+async def learn(
+    found: Optional[TemplateMatch],
+    labels: List[str],
+    record: Dict[str, Any],
+    citations: List[Dict[str, Any]],
+    blocks: List[Dict[str, Any]],
+    clean: Cleaner,
+) -> Optional[str]:
+    """Update (or start) a template from a fully extracted document.
+
+    A learned field region is confirmed each time looking it up on another
+    document of the same layout reproduces that document's extracted value,
+    and replaced when it does not. Fields the template filled itself are not
+    checked, since their region would only confirm its own output. Updates
+    touch one field at a time, so concurrent extractions and reviewer edits of
+    the same layout don't overwrite each other.
+    """
+    if len(labels) < MIN_LABELS:
+        return None
+    db = get_db()
+    now = datetime.utcnow()
+    existing_regions: Dict[str, Dict[str, Any]] = found.template.get("fields", {}) if found else {}
+    filled = set(found.values) if found else set()
+    by_page = _by_page(blocks)
+    cited = {entry["field"]: entry for entry in citations}
+    regions: Dict[str, Dict[str, Any]] = {}
+    confirmed: List[str] = []
+
+    for field_name, value in record.items():
+        if field_name == "fileId" or not value or field_name in filled:
+            continue
+        value = str(value)
+        existing = existing_regions.get(field_name)
+        if existing is not None:
+            hit = _lookup(existing, by_page, field_name, clean)
+            if hit is not None and hit[0] == value:
+                confirmed.append(field_name)
+                continue
+        region = _region(cited.get(field_name, {}), value, field_name, clean)
+        if region is not None:
+            if existing is not None:
+                region["misses"] = existing.get("misses", 0) + 1
+            regions[field_name] = region
+
+    if found is None:
+        template_id = await _start(labels, regions, now)
+    else:
+        template_id = found.template_id
+        await db.templates.update_one(
+            {"templateId": template_id},
+            {
+                "$set": {**{f"fields.{name}": region for name, region in regions.items()}, "updatedAt": now},
+                "$inc": {"documents": 1, **{f"fields.{name}.confirmations": 1 for name in confirmed}},
+            },
+        )
+    _invalidate()
+    return template_id
+
+
+async def _start(labels: List[str], regions: Dict[str, Dict[str, Any]], now: datetime) -> str:
+    """Create the template for a new layout, or join the one another extraction just created for it."""
+    template = {"templateId": str(uuid4()), "labels": labels, "fields": regions, "hits": 0, "createdAt": now}
+
+    async def upsert() -> str:
+        stored = await get_db().templates.find_one_and_update(
+            # The fields of an existing template are left alone: its regions may already be confirmed
+            {"layout": _layout_key(labels)},
+            {"$setOnInsert": template, "$set": {"updatedAt": now}, "$inc": {"documents": 1}},
+            projection={"_id": 0, "templateId": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return stored["templateId"]
+
+    try:
+        return await upsert()
+    except DuplicateKeyError:
+        # Two first documents of a layout raced on the upsert; the retry finds the winner's template
+        return await upsert()
+
+
+async def record_hit(template_id: str) -> None:
+    await get_db().templates.update_one(
+        {"templateId": template_id}, {"$inc": {"hits": 1}, "$set": {"lastHitAt": datetime.utcnow()}}
+    )
+
+
+async def learn_edits(template_id: str, values: Dict[str, str], citations: List[Dict[str, Any]], clean: Cleaner) -> None:
+    """Reviewer corrections are trusted: their regions are confirmed straight away."""
+    cited = {entry["field"]: entry for entry in citations}
+    updates = {}
+    for field_name, value in values.items():
+        region = _region(cited.get(field_name, {}), str(value), field_name, clean) if value else None
+        if region is not None:
+            region.update(confirmations=get_settings().template_min_confirmations, source="edit")
+            updates[f"fields.{field_name}"] = region
+    if updates:
+        await get_db().templates.update_one(
+            {"templateId": template_id}, {"$set": {**updates, "updatedAt": datetime.utcnow()}}
+        )
+        _invalidate()
@@ -0,0 +1,269 @@
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Optional
+from uuid import uuid4
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+from app.config import get_settings
+from app.db import get_db
+from app.services import storage
+
+logger = logging.getLogger(__name__)
+
+# Partial files live outside any fileId directory until the upload is finalized
+SESSION_DIR = storage.BASE_DIR / ".sessions"
+HASH_BLOCK = 1024 * 1024
+
+OPEN = "open"
+COMPLETING = "completing"
+COMPLETE = "complete"
+
+# Chunks of one session are written one at a time per process; across processes
+# the conditional offset update in write_chunk decides which write counts
+_locks: Dict[str, asyncio.Lock] = {}
+
+
+def _part_path(upload_id: str) -> Path:
+    return SESSION_DIR / f"{upload_id}.part"
+
+
+def _public(session: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "uploadId": session["uploadId"],
+        "filename": session["filename"],
+        "size": session["size"],
+        "offset": session["received"],
+        "status": session["status"],
+        "fileId": session.get("fileId"),
+        "expiresAt": session["updatedAt"] + timedelta(seconds=get_settings().upload_session_ttl_seconds),
+    }
+
+
+async def ensure_indexes() -> None:
+    db = get_db()
+    await db.upload_sessions.create_index("uploadId", unique=True)
+    await db.upload_sessions.create_index([("status", 1), ("updatedAt", 1)])
+
+
+async def create(filename: str, size: int, sha256: Optional[str] = None) -> Dict[str, Any]:
+    settings = get_settings()
+    if size > settings.upload_max_mb * 1024 * 1024:
+        raise HTTPException(status_code=413, detail=f"File exceeds {settings.upload_max_mb}MB limit")
+    upload_id = str(uuid4())
+    SESSION_DIR.mkdir(parents=True, exist_ok=True)
+    _part_path(upload_id).touch()
+    now = datetime.utcnow()
+    session = {
+        "uploadId": upload_id,
+        "filename": Path(filename).name,
+        "size": size,
+        "sha256": sha256.lower() if sha256 else None,
+        "received": 0,
+        "status": OPEN,
+        "createdAt": now,
+        "updatedAt": now,
+    }
+    await get_db().upload_sessions.insert_one(dict(session))
+    return _public(session)
+
+
+async def _load(upload_id: str) -> Dict[str, Any]:
+    session = await get_db().upload_sessions.find_one({"uploadId": upload_id}, {"_id": 0})
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return session
+
+
+async def get(upload_id: str) -> Dict[str, Any]:
+    return _public(await _load(upload_id))
+
+
+async def write_chunk(
+    upload_id: str, start: int, end: int, total: int, checksum: str, body: AsyncIterator[bytes]
+) -> Dict[str, Any]:
+    """Write bytes ``start..end`` (inclusive) at their offset, verifying the chunk's SHA-256.
+
+    A chunk that was already received (a retry after a lost response) is
+    accepted without rewriting; one that leaves a gap gets 409 with the
+    current offset so the client can resume from there.
+    """
+    length = end - start + 1
+    if length > get_settings().upload_chunk_max_mb * 1024 * 1024:
+        raise HTTPException(status_code=413, detail=f"Chunks are limited to {get_settings().upload_chunk_max_mb}MB")
+
+    async with _locks.setdefault(upload_id, asyncio.Lock()):
+        session = await _load(upload_id)
+        if session["status"] != OPEN:
+            raise HTTPException(status_code=409, detail=f"Upload session is {session['status']}")
+        if total != session["size"] or end >= session["size"] or end < start:
+            raise HTTPException(status_code=416, detail="Content-Range does not fit the declared size")
+        if end < session["received"]:
+            return _public(session)
+        if start != session["received"]:
+            raise HTTPException(
+                status_code=409,
+                detail={"message": "Chunk does not start at the received offset", "offset": session["received"]},
+            )
+
+        digest = hashlib.sha256()
+        written = 0
+        with _part_path(upload_id).open("r+b") as handle:
+            handle.seek(start)
+            async for piece in body:
+                written += len(piece)
+                if written > length:
+                    break
+                digest.update(piece)
+                handle.write(piece)
+            if written != length or digest.hexdigest() != checksum.lower():
+                # Drop whatever this chunk wrote so the next attempt starts from a clean offset
+                handle.truncate(start)
+                detail = "Chunk checksum mismatch" if written == length else "Chunk length does not match Content-Range"
+                raise HTTPException(status_code=400, detail=detail)
+
+        now = datetime.utcnow()
+        result = await get_db().upload_sessions.update_one(
+            {"uploadId": upload_id, "status": OPEN, "received": start},
+            {"$set": {"received": end + 1, "updatedAt": now}},
+        )
+        if result.matched_count == 0:
+            raise HTTPException(status_code=409, detail="Upload session changed while the chunk was written")
+        return _public({**session, "received": end + 1, "updatedAt": now})
+
+
+def _sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for block in iter(lambda: handle.read(HASH_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _target_path(file_id: str, filename: str) -> Path:
+    return storage.BASE_DIR / file_id / filename
+
+
+async def complete(upload_id: str) -> Dict[str, Any]:
+    """Move the assembled file into the uploads directory and return the finished session.
+
+    Safe to retry, also after a crash part-way: the fileId and target path are
+    recorded when the session moves to ``completing``, and a retry finishes
+    that same move instead of getting stuck.
+    """
+    db = get_db()
+    session = await _load(upload_id)
+    if session["status"] == COMPLETE:
+        return _public(session)
+    if session["status"] == OPEN:
+        file_id = str(uuid4())
+        claimed = await db.upload_sessions.find_one_and_update(
+            {"uploadId": upload_id, "status": OPEN, "received": session["size"]},
+            {
+                "$set": {
+                    "status": COMPLETING,
+                    "fileId": file_id,
+                    "path": str(_target_path(file_id, session["filename"])),
+                    "updatedAt": datetime.utcnow(),
+                }
+            },
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+        if claimed is None:
+            session = await _load(upload_id)
+            if session["status"] == OPEN:
+                raise HTTPException(
+                    status_code=409,
+                    detail={"message": "Upload is incomplete", "offset": session["received"], "size": session["size"]},
+                )
+            if session["status"] == COMPLETE:
+                return _public(session)
+        else:
+            session = claimed
+    return await _finish(session)
+
+
+async def _finish(session: Dict[str, Any]) -> Dict[str, Any]:
+    # Every step can run again: a retry (or a concurrent call) may find the file already moved
+    db = get_db()
+    upload_id = session["uploadId"]
+    part = _part_path(upload_id)
+    target = Path(session["path"])
+    if part.exists():
+        if session.get("sha256") and await asyncio.to_thread(_sha256_file, part) != session["sha256"]:
+            part.unlink(missing_ok=True)
+            await db.upload_sessions.delete_one({"uploadId": upload_id})
+            raise HTTPException(status_code=400, detail="File checksum mismatch; upload discarded")
+        target.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            # Same filesystem as the uploads directory, so this is a rename rather than a copy
+            os.replace(part, target)
+        except FileNotFoundError:
+            if not target.exists():
+                raise
+    elif not target.exists():
+        await db.upload_sessions.delete_one({"uploadId": upload_id})
+        raise HTTPException(status_code=410, detail="Upload data is gone; start a new upload")
+
+    now = datetime.utcnow()
+    await db.upload_sessions.update_one(
+        {"uploadId": upload_id, "status": COMPLETING}, {"$set": {"status": COMPLETE, "updatedAt": now}}
+    )
+    _locks.pop(upload_id, None)
+    return _public({**session, "status": COMPLETE, "updatedAt": now})
+
+
+async def abort(upload_id: str) -> None:
+    session = await _load(upload_id)
+    if session["status"] != OPEN:
+        raise HTTPException(status_code=409, detail=f"Upload session is {session['status']}")
+    await get_db().upload_sessions.delete_one({"uploadId": upload_id, "status": OPEN})
+    _part_path(upload_id).unlink(missing_ok=True)
+    _locks.pop(upload_id, None)
+
+
+async def sweep() -> int:
+    """Delete sessions idle for longer than the TTL, and their partial files; returns how many."""
+    db = get_db()
+    settings = get_settings()
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.upload_session_ttl_seconds)
+    expired = await db.upload_sessions.find(
+        {"status": {"$ne": COMPLETE}, "updatedAt": {"$lt": cutoff}},
+        {"_id": 0, "uploadId": 1, "status": 1, "fileId": 1},
+    ).to_list(None)
+    removed = 0
+    for session in expired:
+        # Re-check the cutoff in the delete so a chunk that just landed keeps its session alive
+        result = await db.upload_sessions.delete_one(
+            {"uploadId": session["uploadId"], "status": {"$ne": COMPLETE}, "updatedAt": {"$lt": cutoff}}
+        )
+        if result.deleted_count:
+            _part_path(session["uploadId"]).unlink(missing_ok=True)
+            if session["status"] == COMPLETING and not await db.files.find_one({"fileId": session["fileId"]}):
+                # A finalize that was never retried may already have moved the file; nothing refers to it
+                await asyncio.to_thread(shutil.rmtree, storage.BASE_DIR / session["fileId"], True)
+            _locks.pop(session["uploadId"], None)
+            removed += 1
+    # Completed sessions only keep the fileId for retried finalize calls
+    await db.upload_sessions.delete_many({"status": COMPLETE, "updatedAt": {"$lt": cutoff}})
+    return removed
+
+
+async def run_sweeper(stop: asyncio.Event) -> None:
+    interval = get_settings().upload_sweep_seconds
+    while not stop.is_set():
+        try:
+            removed = await sweep()
+            if removed:
+                logger.info("Removed %s abandoned upload sessions", removed)
+        except Exception:
+            logger.exception("Upload session sweep failed")
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
@@ -0,0 +1,19 @@
+import base64
+import json
+from typing import Any, Dict
+from fastapi import HTTPException
+
+
+def encode(position: Dict[str, Any]) -> str:
+    """Opaque, URL-safe page token for a keyset position (JSON-serialisable values only)."""
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode().rstrip("=")
+
+
+def decode(token: str) -> Dict[str, Any]:
+    try:
+        position = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from exc
+    if not isinstance(position, dict):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return position
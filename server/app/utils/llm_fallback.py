@@ -1,13 +1,24 @@
 import aiohttp
 import json
 import logging
-from typing import Dict, List
+import time
+from typing import Dict, List, Optional
 from app.config import get_settings
+from app.services import capacity, metrics
+from app.services.deadline import LLM_MIN_SECONDS, Deadline
 
 logger = logging.getLogger(__name__)
 
 
-async def infer_with_llama(normalized_text: str, missing_fields: List[str]) -> Dict[str, str]:
+async def infer_with_llama(
+    normalized_text: str, missing_fields: List[str], timeout: float = 180, deadline: Optional[Deadline] = None
+) -> Dict[str, str]:
+    """Ask Ollama for ``missing_fields``.
+
+    With a ``deadline`` the time left is checked once a slot is free: too little
+    skips the call (recorded as a skipped ``llm`` stage), otherwise the request
+    only waits for what remains.
+    """
     if not missing_fields:
         return {}
 
@@ -30,14 +41,29 @@ Respond with valid JSON only."""
         "stream": False,
         "options": {"temperature": 0.1},
     }
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(f"{settings.ollama_url}/api/generate", json=payload, timeout=180) as resp:
-                resp.raise_for_status()
-                data = await resp.json()
-        text = data.get("response", "{}")
-        return json.loads(text)
-    except Exception as exc:
-        logger.warning("LLM fallback failed: %s", exc)
-        return {}
+    # Queue for a slot before the clock starts so LLM latency reflects Ollama, not contention;
+    # the deadline is checked after the wait, since queueing time is part of the budget
+    async with capacity.llm.slot():
+        if deadline is not None:
+            if not deadline.allows(LLM_MIN_SECONDS):
+                deadline.skip("llm")
+                return {}
+            timeout = min(timeout, deadline.remaining())
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.post(f"{settings.ollama_url}/api/generate", json=payload, timeout=timeout) as resp:
+                    resp.raise_for_status()
+                    data = await resp.json()
+            text = data.get("response", "{}")
+            result = json.loads(text)
+            outcome = "ok"
+            return result
+        except Exception as exc:
+            logger.warning("LLM fallback failed: %s", exc)
+            return {}
+        finally:
+            metrics.LLM_SECONDS.observe(time.perf_counter() - start, outcome=outcome)
+            metrics.LLM_REQUESTS.inc(outcome=outcome)
 
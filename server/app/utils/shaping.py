@@ -0,0 +1,53 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from fastapi import HTTPException, Query
+from fastapi.responses import ORJSONResponse
+from app.schemas.extraction import ExtractionRecord
+
+FIELD_NAMES = list(ExtractionRecord.model_fields)
+
+
+@dataclass
+class Shape:
+    """How much of an extraction a response carries; every option defaults to the full payload."""
+
+    fields: List[str]
+    omit_empty: bool = False
+    citations: bool = True
+    selected: bool = False
+
+    def projection(self) -> Dict[str, int]:
+        """Mongo projection that reads only what the response will contain."""
+        projection = {"_id": 0, **{name: 1 for name in self.fields}}
+        if self.citations:
+            projection["citations"] = 1
+        return projection
+
+
+def shape_params(
+    fields: Optional[str] = Query(None, description="Comma-separated record fields to return (fileId is always included)"),
+    omitEmpty: bool = Query(False, description="Leave out empty fields"),
+    citations: bool = Query(True, description="Set to false to leave out citations"),
+) -> Shape:
+    if not fields:
+        return Shape(FIELD_NAMES, omitEmpty, citations)
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = sorted(set(names) - set(FIELD_NAMES))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    selected = ["fileId"] + [name for name in FIELD_NAMES if name in names and name != "fileId"]
+    return Shape(selected, omitEmpty, citations, selected=True)
+
+
+def shaped(record: Dict[str, Any], citations: Optional[List[Dict[str, Any]]], shape: Shape) -> ORJSONResponse:
+    """Build ``{"data", "citations"}`` straight from stored values, skipping model validation and the stdlib encoder."""
+    data = {name: record.get(name, "") for name in shape.fields}
+    if shape.omit_empty:
+        data = {name: value for name, value in data.items() if value not in ("", None)}
+    body: Dict[str, Any] = {"data": data}
+    if shape.citations:
+        citations = citations or []
+        if shape.selected:
+            citations = [entry for entry in citations if entry.get("field") in data]
+        body["citations"] = citations
+    return ORJSONResponse(body)
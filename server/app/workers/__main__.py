@@ -0,0 +1,42 @@
+"""Standalone extraction worker.
+
+Usage (from ``server/``)::
+
+    python -m app.workers --concurrency 2
+
+Claims jobs enqueued with ``POST /extract/jobs`` from the Mongo ``jobs``
+collection. Run as many of these as needed, on any host that can reach Mongo
+and the uploads directory. SIGINT/SIGTERM stop claiming and let in-flight jobs
+finish.
+"""
+import argparse
+import asyncio
+import logging
+import signal
+from typing import List
+from app.workers.worker import run_worker
+
+
+async def _main(args: argparse.Namespace) -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            pass
+    await run_worker(args.concurrency, args.poll_interval, args.worker_id, stop)
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Run extraction jobs from the Mongo job queue")
+    parser.add_argument("--concurrency", type=int, help="Jobs run at once (default WORKER_CONCURRENCY)")
+    parser.add_argument("--poll-interval", type=float, help="Seconds to wait when the queue is empty")
+    parser.add_argument("--worker-id", help="Defaults to <hostname>:<pid>")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
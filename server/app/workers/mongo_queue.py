@@ -0,0 +1,159 @@
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from uuid import uuid4
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING, ReturnDocument
+from app.config import get_settings
+from app.db import get_db
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+DEAD = "dead"
+
+
+class MongoJobQueue:
+    """Durable job queue stored in one Mongo collection.
+
+    Jobs are claimed atomically with ``find_one_and_update`` and held under a
+    lease that the worker extends with heartbeats. A job whose lease expires
+    (crashed or partitioned worker) becomes claimable again. Failures are
+    retried with exponential backoff until ``maxAttempts``, then parked as
+    ``dead``. Only single-document atomic updates are used, so a standalone
+    mongod is enough (no replica set or transactions).
+    """
+
+    def __init__(
+        self,
+        collection: AsyncIOMotorCollection,
+        lease_seconds: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+        backoff_seconds: Optional[float] = None,
+        max_backoff_seconds: float = 3600.0,
+        files: Optional[AsyncIOMotorCollection] = None,
+    ):
+        settings = get_settings()
+        self.collection = collection
+        # Jobs retired here rather than in the worker still need their file marked failed
+        self.files = files if files is not None else collection.database.files
+        self.lease_seconds = lease_seconds or settings.job_lease_seconds
+        self.max_attempts = max_attempts or settings.job_max_attempts
+        self.backoff_seconds = backoff_seconds or settings.job_backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+
+    async def ensure_indexes(self) -> None:
+        await self.collection.create_index("jobId", unique=True)
+        await self.collection.create_index([("status", ASCENDING), ("availableAt", ASCENDING)])
+        await self.collection.create_index([("status", ASCENDING), ("leaseExpiresAt", ASCENDING)])
+        await self.collection.create_index("fileId")
+
+    async def enqueue(self, file_id: str, kind: str = "extract", payload: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        now = datetime.utcnow()
+        job = {
+            "jobId": str(uuid4()),
+            "kind": kind,
+            "fileId": file_id,
+            "payload": payload or {},
+            "status": QUEUED,
+            "attempts": 0,
+            "maxAttempts": self.max_attempts,
+            "availableAt": now,
+            "createdAt": now,
+            "updatedAt": now,
+        }
+        await self.collection.insert_one(job)
+        job.pop("_id", None)
+        return job
+
+    async def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """Atomically take the oldest runnable job, or one whose lease has expired."""
+        while True:
+            now = datetime.utcnow()
+            job = await self.collection.find_one_and_update(
+                {
+                    "$or": [
+                        {"status": QUEUED, "availableAt": {"$lte": now}},
+                        {"status": RUNNING, "leaseExpiresAt": {"$lte": now}},
+                    ]
+                },
+                {
+                    "$set": {
+                        "status": RUNNING,
+                        "workerId": worker_id,
+                        "leaseExpiresAt": now + timedelta(seconds=self.lease_seconds),
+                        "claimedAt": now,
+                        "updatedAt": now,
+                    },
+                    "$inc": {"attempts": 1},
+                },
+                sort=[("availableAt", ASCENDING)],
+                return_document=ReturnDocument.AFTER,
+                projection={"_id": 0},
+            )
+            if job is None:
+                return None
+            # A job that keeps killing its worker never reaches fail(); retire it here
+            if job["attempts"] > job.get("maxAttempts", self.max_attempts):
+                error = "Lease expired too many times"
+                if await self._finish(job["jobId"], worker_id, DEAD, {"lastError": error}):
+                    # Like a failed last attempt, but only files the job left queued or locked mid-extraction
+                    await self.files.update_one(
+                        {"fileId": job["fileId"], "status": {"$in": ["queued", "extracting"]}},
+                        {"$set": {"status": "failed", "error": error}},
+                    )
+                continue
+            return job
+
+    async def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """Extend the lease; False means the lease was lost and another worker may own the job."""
+        now = datetime.utcnow()
+        result = await self.collection.update_one(
+            {"jobId": job_id, "status": RUNNING, "workerId": worker_id},
+            {"$set": {"leaseExpiresAt": now + timedelta(seconds=self.lease_seconds), "updatedAt": now}},
+        )
+        return result.matched_count == 1
+
+    async def _finish(self, job_id: str, worker_id: str, status: str, extra: Dict[str, Any]) -> bool:
+        now = datetime.utcnow()
+        result = await self.collection.update_one(
+            {"jobId": job_id, "status": RUNNING, "workerId": worker_id},
+            {"$set": {"status": status, "updatedAt": now, "finishedAt": now, **extra}, "$unset": {"leaseExpiresAt": ""}},
+        )
+        return result.matched_count == 1
+
+    async def complete(self, job_id: str, worker_id: str, result: Optional[Dict[str, Any]] = None) -> bool:
+        return await self._finish(job_id, worker_id, DONE, {"result": result or {}})
+
+    def backoff(self, attempts: int) -> float:
+        delay = min(self.max_backoff_seconds, self.backoff_seconds * 2 ** max(0, attempts - 1))
+        # Jitter spreads retries of jobs that failed together (e.g. Mongo or Ollama blip)
+        return delay * random.uniform(0.5, 1.0)
+
+    async def fail(self, job: Dict[str, Any], worker_id: str, error: str) -> str:
+        """Schedule a retry with backoff, or move the job to ``dead`` after its last attempt."""
+        if job["attempts"] >= job.get("maxAttempts", self.max_attempts):
+            await self._finish(job["jobId"], worker_id, DEAD, {"lastError": error})
+            return DEAD
+        now = datetime.utcnow()
+        await self.collection.update_one(
+            {"jobId": job["jobId"], "status": RUNNING, "workerId": worker_id},
+            {
+                "$set": {
+                    "status": QUEUED,
+                    "availableAt": now + timedelta(seconds=self.backoff(job["attempts"])),
+                    "lastError": error,
+                    "updatedAt": now,
+                },
+                "$unset": {"leaseExpiresAt": "", "workerId": ""},
+            },
+        )
+        return QUEUED
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one({"jobId": job_id}, {"_id": 0})
+
+
+def get_job_queue() -> MongoJobQueue:
+    db = get_db()
+    return MongoJobQueue(db.jobs, files=db.files)
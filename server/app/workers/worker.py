@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import os
+import socket
+import traceback
+from typing import Any, Dict, Optional
+from app.config import get_settings
+from app.db import ensure_indexes, get_db
+from app.services import extractor, singleflight
+from app.services.deadline import Deadline
+from app.workers.mongo_queue import DEAD, MongoJobQueue, get_job_queue
+
+logger = logging.getLogger(__name__)
+
+
+class LeaseLost(Exception):
+    pass
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+async def _heartbeat(queue: MongoJobQueue, job_id: str, worker_id: str, task: asyncio.Task) -> None:
+    interval = max(1.0, queue.lease_seconds / 3)
+    while not task.done():
+        await asyncio.sleep(interval)
+        if not await queue.heartbeat(job_id, worker_id):
+            logger.warning("Lost lease on job %s; abandoning it", job_id)
+            task.cancel()
+            return
+
+
+async def _run_extract(job: Dict[str, Any]) -> Dict[str, Any]:
+    db = get_db()
+    file_id = job["fileId"]
+    if job.get("kind") == "complete":
+        record, _ = await extractor.complete_partial(file_id)
+        return {"fieldsFound": extractor._fields_found(record)}
+
+    file_doc = await db.files.find_one({"fileId": file_id})
+    if not file_doc:
+        raise LookupError(f"File {file_id} not found")
+
+    options = job.get("payload", {})
+    deadline = Deadline.from_settings(options.get("deadlineSeconds"))
+    record, _ = await singleflight.extract(file_doc, force=options.get("force", False), label="job", deadline=deadline)
+    return {"fieldsFound": extractor._fields_found(record)}
+
+
+async def process(queue: MongoJobQueue, job: Dict[str, Any], worker_id: str) -> None:
+    file_id = job["fileId"]
+    task = asyncio.create_task(_run_extract(job))
+    heartbeat = asyncio.create_task(_heartbeat(queue, job["jobId"], worker_id, task))
+    try:
+        result = await task
+    except asyncio.CancelledError:
+        if heartbeat.done():
+            # Lease lost: whoever reclaimed the job owns its status now
+            return
+        raise
+    except Exception as exc:
+        logger.exception("Job %s for %s failed (attempt %s)", job["jobId"], file_id, job["attempts"])
+        outcome = await queue.fail(job, worker_id, str(exc))
+        await get_db().files.update_one(
+            {"fileId": file_id},
+            {
+                "$set": {
+                    "status": "failed" if outcome == DEAD else "queued",
+                    "error": str(exc),
+                    "traceback": traceback.format_exc(),
+                }
+            },
+        )
+        return
+    finally:
+        heartbeat.cancel()
+    await queue.complete(job["jobId"], worker_id, result)
+
+
+async def _loop(queue: MongoJobQueue, worker_id: str, poll_seconds: float, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        job = await queue.claim(worker_id)
+        if job is None:
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        await process(queue, job, worker_id)
+
+
+async def run_worker(
+    concurrency: Optional[int] = None,
+    poll_seconds: Optional[float] = None,
+    worker_id: Optional[str] = None,
+    stop: Optional[asyncio.Event] = None,
+) -> None:
+    """Claim and run extraction jobs until ``stop`` is set; in-flight jobs finish first."""
+    settings = get_settings()
+    concurrency = concurrency or settings.worker_concurrency
+    poll_seconds = poll_seconds or settings.worker_poll_seconds
+    worker_id = worker_id or default_worker_id()
+    stop = stop or asyncio.Event()
+
+    await ensure_indexes()
+    queue = get_job_queue()
+    logger.info("Worker %s started with %s slot(s)", worker_id, concurrency)
+    await asyncio.gather(
+        *(_loop(queue, f"{worker_id}/{slot}", poll_seconds, stop) for slot in range(concurrency))
+    )
+    logger.info("Worker %s stopped", worker_id)
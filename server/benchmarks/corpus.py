@@ -0,0 +1,187 @@
+"""Deterministic synthetic loss-run corpus used by the stage benchmarks.
+
+Every generator takes a seed, so two runs on different machines produce the
+same documents and their timings are comparable.
+"""
+from pathlib import Path
+from random import Random
+from typing import Dict, List
+import fitz
+import pandas as pd
+
+SIZES = {
+    "small": {"pages": 1, "claims": 10},
+    "medium": {"pages": 10, "claims": 100},
+    "large": {"pages": 100, "claims": 1000},
+}
+
+CARRIERS = ["Acme Mutual", "Northwind Casualty", "Contoso Insurance Co", "Fabrikam Specialty"]
+STATES = ["CA", "TX", "NY", "FL", "IL", "WA"]
+CITIES = ["Springfield", "Riverside", "Franklin", "Georgetown", "Madison"]
+DESCRIPTIONS = [
+    "Employee slipped on wet floor in warehouse aisle",
+    "Rear-end collision while making deliveries",
+    "Back strain lifting boxes from loading dock",
+    "Laceration to hand operating box cutter",
+]
+
+TABLE_COLUMNS = [
+    "Policy Number", "Insured", "Carrier", "Claim Number", "Claimant", "Claim Status",
+    "Date of Loss", "Reported Date", "Loss Description", "State", "City",
+    "Medical Paid", "Indemnity Paid", "Expenses Paid", "Total Paid", "Total Incurred",
+]
+
+
+def _date(rng: Random) -> str:
+    return f"{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}/{rng.randint(2015, 2024)}"
+
+
+def _amount(rng: Random) -> str:
+    return f"{rng.randint(0, 250000):,}.{rng.randint(0, 99):02d}"
+
+
+def make_claims(seed: int, count: int) -> List[Dict[str, str]]:
+    rng = Random(seed)
+    policy = f"POL-{rng.randint(100000, 999999)}"
+    insured = f"{rng.choice(['Blue', 'Red', 'Green'])} {rng.choice(['Logistics', 'Foods', 'Builders'])} LLC"
+    carrier = rng.choice(CARRIERS)
+    claims = []
+    for index in range(count):
+        claims.append(
+            {
+                "Policy Number": policy,
+                "Insured": insured,
+                "Carrier": carrier,
+                "Claim Number": f"CLM-{seed:04d}-{index:05d}",
+                "Claimant": f"Claimant {index}",
+                "Claim Status": rng.choice(["O", "C", "R"]),
+                "Date of Loss": _date(rng),
+                "Reported Date": _date(rng),
+                "Loss Description": rng.choice(DESCRIPTIONS),
+                "State": rng.choice(STATES),
+                "City": rng.choice(CITIES),
+                "Medical Paid": _amount(rng),
+                "Indemnity Paid": _amount(rng),
+                "Expenses Paid": _amount(rng),
+                "Total Paid": _amount(rng),
+                "Total Incurred": _amount(rng),
+            }
+        )
+    return claims
+
+
+def _header_lines(claim: Dict[str, str]) -> List[str]:
+    return [
+        "LOSS RUN REPORT",
+        f"Policy Number: {claim['Policy Number']}",
+        f"Insured: {claim['Insured']}",
+        f"Carrier: {claim['Carrier']}",
+        f"Valued Date: {claim['Reported Date']}",
+        "",
+    ]
+
+
+def _claim_lines(claim: Dict[str, str]) -> List[str]:
+    return [
+        f"Claim Number: {claim['Claim Number']}   Claimant: {claim['Claimant']}   Status: {claim['Claim Status']}",
+        f"Date of Loss: {claim['Date of Loss']}   Reported Date: {claim['Reported Date']}",
+        f"Loss Description: {claim['Loss Description']}",
+        f"State: {claim['State']}   City: {claim['City']}",
+        f"Medical Paid: {claim['Medical Paid']}   Indemnity Paid: {claim['Indemnity Paid']}   Expenses Paid: {claim['Expenses Paid']}",
+        f"Total Paid: {claim['Total Paid']}   Total Incurred: {claim['Total Incurred']}",
+        "",
+    ]
+
+
+def loss_run_text(seed: int, pages: int, claims: int) -> List[List[str]]:
+    """Return the text lines of each page of a synthetic loss run."""
+    rows = make_claims(seed, claims)
+    per_page = max(1, -(-len(rows) // pages))
+    page_lines = []
+    for page_index in range(pages):
+        chunk = rows[page_index * per_page:(page_index + 1) * per_page] or rows[:1]
+        lines = _header_lines(chunk[0]) if page_index == 0 else [f"Page {page_index + 1}", ""]
+        for claim in chunk:
+            lines.extend(_claim_lines(claim))
+        page_lines.append(lines)
+    return page_lines
+
+
+def write_digital_pdf(path: Path, seed: int, pages: int, claims: int) -> Path:
+    doc = fitz.open()
+    try:
+        for lines in loss_run_text(seed, pages, claims):
+            page = doc.new_page(width=612, height=792)
+            y = 36.0
+            for line in lines:
+                if y > 770:
+                    break
+                if line:
+                    page.insert_text((36, y), line, fontsize=7)
+                y += 9.0
+        doc.save(str(path))
+    finally:
+        doc.close()
+    return path
+
+
+def write_scanned_pdf(path: Path, source: Path, max_pages: int = 3) -> Path:
+    """Rasterize the first pages of a digital PDF into an image-only PDF."""
+    src = fitz.open(str(source))
+    out = fitz.open()
+    try:
+        for page_index in range(min(len(src), max_pages)):
+            pix = src.load_page(page_index).get_pixmap(matrix=fitz.Matrix(1.5, 1.5))
+            page = out.new_page(width=612, height=792)
+            page.insert_image(page.rect, pixmap=pix)
+        out.save(str(path))
+    finally:
+        src.close()
+        out.close()
+    return path
+
+
+def write_image_heavy_pdf(path: Path, seed: int, pages: int) -> Path:
+    """Text pages that each also embed a large incompressible raster, like scanned attachments."""
+    rng = Random(seed)
+    doc = fitz.open()
+    try:
+        for lines in loss_run_text(seed, pages, pages * 2):
+            page = doc.new_page(width=612, height=792)
+            samples = rng.randbytes(1200 * 1200 * 3)
+            pix = fitz.Pixmap(fitz.csRGB, 1200, 1200, samples, False)
+            page.insert_image(fitz.Rect(36, 300, 576, 760), pixmap=pix)
+            y = 36.0
+            for line in lines[:28]:
+                if line:
+                    page.insert_text((36, y), line, fontsize=7)
+                y += 9.0
+        doc.save(str(path))
+    finally:
+        doc.close()
+    return path
+
+
+def write_table(path: Path, seed: int, claims: int) -> Path:
+    df = pd.DataFrame(make_claims(seed, claims), columns=TABLE_COLUMNS)
+    if path.suffix == ".csv":
+        df.to_csv(path, index=False)
+    else:
+        df.to_excel(path, index=False)
+    return path
+
+
+def build_corpus(target_dir: Path, sizes: List[str], seed: int = 7) -> Dict[str, Dict[str, Path]]:
+    """Write the corpus for the requested sizes and return ``{size: {kind: path}}``."""
+    target_dir.mkdir(parents=True, exist_ok=True)
+    corpus: Dict[str, Dict[str, Path]] = {}
+    for size in sizes:
+        spec = SIZES[size]
+        digital = write_digital_pdf(target_dir / f"{size}_digital.pdf", seed, spec["pages"], spec["claims"])
+        corpus[size] = {
+            "digital_pdf": digital,
+            "scanned_pdf": write_scanned_pdf(target_dir / f"{size}_scanned.pdf", digital),
+            "csv": write_table(target_dir / f"{size}.csv", seed, spec["claims"]),
+            "xlsx": write_table(target_dir / f"{size}.xlsx", seed, spec["claims"]),
+        }
+    return corpus
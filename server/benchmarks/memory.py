@@ -0,0 +1,84 @@
+"""Peak-RSS benchmark for PDF text extraction on image-heavy documents.
+
+Usage (from ``server/``)::
+
+    python -m benchmarks.memory --pages 40
+
+Each variant runs in a fresh interpreter so peak RSS (``ru_maxrss``) reflects
+only that extraction. ``words`` is the current ``pdf_service`` path (text-only
+``words`` tuples regrouped into blocks); ``dict-text-only`` calls
+``get_text("dict")`` without image preservation, and ``dict`` uses PyMuPDF's
+default ``dict`` flags, which decode every embedded image and build nested
+span dicts, to show what the tuple path saves.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+from benchmarks.corpus import write_image_heavy_pdf
+
+SERVER_DIR = Path(__file__).resolve().parent.parent
+
+CHILD = """
+import json, resource, sys, time
+import fitz
+from app.services import pdf_service
+variant = sys.argv[2]
+baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+if variant == "words":
+    blocks = len(pdf_service.extract_text_with_boxes(sys.argv[1], parallel=False).blocks)
+else:
+    flags = fitz.TEXTFLAGS_DICT if variant == "dict" else fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+    blocks = 0
+    with fitz.open(sys.argv[1]) as doc:
+        for page in doc:
+            blocks += sum(1 for block in page.get_text("dict", flags=flags)["blocks"] if "lines" in block)
+elapsed = time.perf_counter() - start
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"seconds": elapsed, "peak_rss_mb": peak / 1024, "import_rss_mb": baseline / 1024, "blocks": blocks}))
+"""
+
+VARIANTS = ["dict", "dict-text-only", "words"]
+
+
+def measure(path: Path, variant: str) -> Dict[str, float]:
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD, str(path), variant],
+        cwd=SERVER_DIR,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare peak RSS of PDF text extraction variants")
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", type=Path, help="Write results JSON here")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="docx-mem-") as tmp:
+        path = write_image_heavy_pdf(Path(tmp) / "image_heavy.pdf", args.seed, args.pages)
+        size_mb = path.stat().st_size / 1024 / 1024
+        results = {variant: measure(path, variant) for variant in VARIANTS}
+
+    print(f"image-heavy PDF: {args.pages} pages, {size_mb:.1f} MB")
+    for variant, stats in results.items():
+        print(
+            f"{variant:<15} peak RSS {stats['peak_rss_mb']:8.1f} MB "
+            f"(+{stats['peak_rss_mb'] - stats['import_rss_mb']:.1f} MB over imports)  "
+            f"{stats['seconds'] * 1000:8.1f} ms  {stats['blocks']} blocks"
+        )
+    if args.output:
+        args.output.write_text(json.dumps({"pages": args.pages, "results": results}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
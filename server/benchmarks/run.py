@@ -0,0 +1,151 @@
+"""Stage-level extraction benchmarks.
+
+Usage (from ``server/``)::
+
+    python -m benchmarks.run                       # run and compare with benchmarks/baseline.json
+    python -m benchmarks.run --sizes small medium  # restrict the corpus
+    python -m benchmarks.run --save-baseline       # overwrite the stored baseline
+
+Each stage is timed in isolation against the synthetic corpus from
+``benchmarks.corpus``. The run exits non-zero when any stage's median is slower
+than the baseline median by more than ``--threshold`` (relative).
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+from benchmarks.corpus import SIZES, build_corpus
+from app.services import citation, excel_service, ocr_service, pdf_service
+from app.services.extractor import SERIES_PATTERNS, _extract_series, rule_based_extract
+from app.utils.file_detector import detect_type
+
+BENCH_DIR = Path(__file__).resolve().parent
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+# OCR costs seconds per page, so it only runs on the small scanned document by default
+OCR_SIZES = {"small"}
+
+
+def _time(fn: Callable[[], Any], repeat: int, warmup: int = 1) -> Dict[str, float]:
+    for _ in range(warmup):
+        fn()
+    samples: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return {
+        "median_s": statistics.median(samples),
+        "min_s": min(samples),
+        "max_s": max(samples),
+        "runs": len(samples),
+    }
+
+
+def _stage_cases(size: str, files: Dict[str, Path]) -> Dict[str, Callable[[], Any]]:
+    digital = str(files["digital_pdf"])
+    scanned = str(files["scanned_pdf"])
+    csv_path = str(files["csv"])
+    xlsx_path = str(files["xlsx"])
+
+    # Inputs for the pure-python stages are prepared once, outside the timed region
+    pdf_result = pdf_service.extract_text_with_boxes(digital)
+    raw_text = pdf_result.full_text
+    fields = rule_based_extract(raw_text)
+
+    cases: Dict[str, Callable[[], Any]] = {
+        f"detect_type/{size}/digital_pdf": lambda: detect_type(digital),
+        f"detect_type/{size}/scanned_pdf": lambda: detect_type(scanned),
+        f"extract_text_with_boxes/{size}": lambda: pdf_service.extract_text_with_boxes(digital),
+        f"read_table/{size}/csv": lambda: excel_service.read_table(csv_path),
+        f"read_table/{size}/xlsx": lambda: excel_service.read_table(xlsx_path),
+        f"rule_based_extract/{size}": lambda: rule_based_extract(raw_text),
+        f"_extract_series/{size}": lambda: [
+            _extract_series(raw_text, base_field, meta) for base_field, meta in SERIES_PATTERNS.items()
+        ],
+        f"map_fields_to_boxes/{size}": lambda: citation.map_fields_to_boxes(fields, pdf_result.blocks),
+    }
+    if size in OCR_SIZES:
+        cases[f"ocr_pages/{size}"] = lambda: ocr_service.ocr_pages(scanned, [1])
+    return cases
+
+
+def run(sizes: List[str], repeat: int, stages: List[str], corpus_dir: Path) -> Dict[str, Any]:
+    corpus = build_corpus(corpus_dir, sizes)
+    results: Dict[str, Dict[str, float]] = {}
+    for size in sizes:
+        for name, fn in _stage_cases(size, corpus[size]).items():
+            if stages and name.split("/")[0] not in stages:
+                continue
+            # OCR is far too slow to repeat as often as the regex stages
+            runs = 1 if name.startswith("ocr_pages") else repeat
+            results[name] = _time(fn, runs)
+            print(f"{name:<45} median {results[name]['median_s'] * 1000:10.2f} ms")
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Return a line for every stage slower than ``baseline * (1 + threshold)``."""
+    regressions = []
+    for name, stats in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base or not base.get("median_s"):
+            continue
+        ratio = stats["median_s"] / base["median_s"]
+        if ratio > 1 + threshold:
+            regressions.append(
+                f"{name}: {stats['median_s'] * 1000:.2f} ms vs baseline {base['median_s'] * 1000:.2f} ms ({ratio:.2f}x)"
+            )
+    return regressions
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Time extraction stages on a synthetic corpus")
+    parser.add_argument("--sizes", nargs="+", choices=sorted(SIZES), default=["small", "medium"])
+    parser.add_argument("--stages", nargs="*", default=[], help="Only run these stage names")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed relative slowdown")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--output", type=Path, help="Write results JSON here")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the baseline")
+    parser.add_argument("--corpus-dir", type=Path, help="Keep the generated corpus in this directory")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="docx-bench-") as tmp:
+        current = run(args.sizes, args.repeat, args.stages, args.corpus_dir or Path(tmp))
+
+    if args.output:
+        args.output.write_text(json.dumps(current, indent=2))
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(current, indent=2))
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}; run with --save-baseline first")
+        return 0
+
+    regressions = compare(current, json.loads(args.baseline.read_text()), args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} stage(s) regressed by more than {args.threshold:.0%}:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"\nNo regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,354 @@
+"""In-memory stand-in for the subset of the Motor API the app uses.
+
+Install it with ``app.db._client = MemoryClient()`` before the first request.
+Documents are deep-copied on the way in and out so callers can't mutate the
+store behind its back, mirroring a round trip through BSON.
+"""
+import asyncio
+import copy
+import re
+from datetime import datetime
+from itertools import count
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+_object_ids = count(1)
+
+
+def _get_path(doc: Dict[str, Any], path: str) -> Tuple[bool, Any]:
+    current: Any = doc
+    for part in path.split("."):
+        if isinstance(current, dict) and part in current:
+            current = current[part]
+        else:
+            return False, None
+    return True, current
+
+
+def _set_path(doc: Dict[str, Any], path: str, value: Any) -> None:
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def _unset_path(doc: Dict[str, Any], path: str) -> None:
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.get(part, {})
+    doc.pop(parts[-1], None)
+
+
+def _compare(op: str, actual: Any, expected: Any) -> bool:
+    try:
+        if op == "$gt":
+            return actual > expected
+        if op == "$gte":
+            return actual >= expected
+        if op == "$lt":
+            return actual < expected
+        if op == "$lte":
+            return actual <= expected
+    except TypeError:
+        return False
+    raise ValueError(f"Unsupported operator {op}")
+
+
+def _match_condition(found: bool, actual: Any, condition: Any) -> bool:
+    if isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition):
+        for op, expected in condition.items():
+            if op == "$exists":
+                if bool(expected) != found:
+                    return False
+            elif op == "$eq":
+                if actual != expected:
+                    return False
+            elif op == "$ne":
+                if found and actual == expected:
+                    return False
+            elif op == "$in":
+                values = actual if isinstance(actual, list) else [actual]
+                if not any(value in expected for value in values):
+                    return False
+            elif op == "$nin":
+                values = actual if isinstance(actual, list) else [actual]
+                if any(value in expected for value in values):
+                    return False
+            elif op == "$regex":
+                flags = re.IGNORECASE if "i" in condition.get("$options", "") else 0
+                if not isinstance(actual, str) or not re.search(expected, actual, flags):
+                    return False
+            elif op == "$options":
+                continue
+            else:
+                if not found or not _compare(op, actual, expected):
+                    return False
+        return True
+    if isinstance(actual, list) and not isinstance(condition, list):
+        return condition in actual
+    return found and actual == condition if condition is not None else (not found or actual is None)
+
+
+def matches(doc: Dict[str, Any], query: Optional[Dict[str, Any]]) -> bool:
+    for key, condition in (query or {}).items():
+        if key == "$or":
+            if not any(matches(doc, sub) for sub in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(doc, sub) for sub in condition):
+                return False
+        else:
+            found, actual = _get_path(doc, key)
+            if not _match_condition(found, actual, condition):
+                return False
+    return True
+
+
+def _project(doc: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    doc = copy.deepcopy(doc)
+    if not projection:
+        return doc
+    include_id = projection.get("_id", 1)
+    fields = {key: value for key, value in projection.items() if key != "_id"}
+    if fields and all(fields.values()):
+        projected = {key: doc[key] for key in fields if key in doc}
+        if include_id and "_id" in doc:
+            projected["_id"] = doc["_id"]
+        return projected
+    for key in fields:
+        _unset_path(doc, key)
+    if not include_id:
+        doc.pop("_id", None)
+    return doc
+
+
+def _apply_update(doc: Dict[str, Any], update: Dict[str, Any], inserting: bool) -> None:
+    for op, changes in update.items():
+        if op == "$set":
+            for key, value in changes.items():
+                _set_path(doc, key, copy.deepcopy(value))
+        elif op == "$setOnInsert":
+            if inserting:
+                for key, value in changes.items():
+                    _set_path(doc, key, copy.deepcopy(value))
+        elif op == "$unset":
+            for key in changes:
+                _unset_path(doc, key)
+        elif op == "$inc":
+            for key, value in changes.items():
+                _, current = _get_path(doc, key)
+                _set_path(doc, key, (current or 0) + value)
+        elif op == "$push":
+            for key, value in changes.items():
+                _, current = _get_path(doc, key)
+                _set_path(doc, key, list(current or []) + [copy.deepcopy(value)])
+        elif op == "$currentDate":
+            for key in changes:
+                _set_path(doc, key, datetime.utcnow())
+        else:
+            raise ValueError(f"Unsupported update operator {op}")
+
+
+def _sort_key(spec: List[Tuple[str, int]]):
+    def key(doc: Dict[str, Any]):
+        parts = []
+        for field, _ in spec:
+            found, value = _get_path(doc, field)
+            parts.append((found and value is not None, value))
+        return parts
+    return key
+
+
+class UpdateResult:
+    def __init__(self, matched_count: int, modified_count: int, upserted_id: Any = None):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.upserted_id = upserted_id
+
+
+class InsertOneResult:
+    def __init__(self, inserted_id: Any):
+        self.inserted_id = inserted_id
+
+
+class DeleteResult:
+    def __init__(self, deleted_count: int):
+        self.deleted_count = deleted_count
+
+
+class MemoryCursor:
+    def __init__(self, docs: List[Dict[str, Any]], projection: Optional[Dict[str, Any]]):
+        self._docs = docs
+        self._projection = projection
+        self._sort: List[Tuple[str, int]] = []
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key_or_list: Any, direction: int = 1) -> "MemoryCursor":
+        if isinstance(key_or_list, str):
+            self._sort = [(key_or_list, direction)]
+        else:
+            self._sort = list(key_or_list)
+        return self
+
+    def skip(self, value: int) -> "MemoryCursor":
+        self._skip = value
+        return self
+
+    def limit(self, value: int) -> "MemoryCursor":
+        self._limit = value
+        return self
+
+    def _materialize(self) -> List[Dict[str, Any]]:
+        docs = list(self._docs)
+        # Stable multi-key sort: apply the least significant key first
+        for field, direction in reversed(self._sort):
+            docs.sort(key=_sort_key([(field, direction)]), reverse=direction < 0)
+        docs = docs[self._skip:]
+        if self._limit:
+            docs = docs[: self._limit]
+        return [_project(doc, self._projection) for doc in docs]
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        docs = self._materialize()
+        return docs[:length] if length else docs
+
+    def __aiter__(self):
+        self._iter = iter(self._materialize())
+        return self
+
+    async def __anext__(self) -> Dict[str, Any]:
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration from None
+
+
+class MemoryCollection:
+    def __init__(self, name: str):
+        self.name = name
+        self._docs: List[Dict[str, Any]] = []
+        self._lock = asyncio.Lock()
+        self.indexes: List[Any] = []
+
+    def _find(self, query: Optional[Dict[str, Any]]) -> Iterable[Dict[str, Any]]:
+        return (doc for doc in self._docs if matches(doc, query))
+
+    async def create_index(self, keys: Any, **kwargs: Any) -> str:
+        self.indexes.append((keys, kwargs))
+        return kwargs.get("name") or str(keys)
+
+    async def find_one(self, query: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None, sort: Any = None):
+        cursor = self.find(query, projection)
+        if sort:
+            cursor.sort(sort)
+        docs = await cursor.limit(1).to_list()
+        return docs[0] if docs else None
+
+    def find(self, query: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None) -> MemoryCursor:
+        return MemoryCursor(list(self._find(query)), projection)
+
+    async def count_documents(self, query: Optional[Dict[str, Any]] = None) -> int:
+        return sum(1 for _ in self._find(query))
+
+    async def insert_one(self, doc: Dict[str, Any]) -> InsertOneResult:
+        async with self._lock:
+            stored = copy.deepcopy(doc)
+            stored.setdefault("_id", next(_object_ids))
+            doc.setdefault("_id", stored["_id"])
+            self._docs.append(stored)
+            return InsertOneResult(stored["_id"])
+
+    def _upsert_seed(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        seed: Dict[str, Any] = {"_id": next(_object_ids)}
+        for key, value in query.items():
+            if not key.startswith("$") and not isinstance(value, dict):
+                _set_path(seed, key, copy.deepcopy(value))
+        return seed
+
+    async def update_one(self, query: Dict[str, Any], update: Dict[str, Any], upsert: bool = False) -> UpdateResult:
+        async with self._lock:
+            for doc in self._find(query):
+                _apply_update(doc, update, inserting=False)
+                return UpdateResult(1, 1)
+            if upsert:
+                doc = self._upsert_seed(query)
+                _apply_update(doc, update, inserting=True)
+                self._docs.append(doc)
+                return UpdateResult(0, 0, doc["_id"])
+            return UpdateResult(0, 0)
+
+    async def update_many(self, query: Dict[str, Any], update: Dict[str, Any]) -> UpdateResult:
+        async with self._lock:
+            docs = list(self._find(query))
+            for doc in docs:
+                _apply_update(doc, update, inserting=False)
+            return UpdateResult(len(docs), len(docs))
+
+    async def find_one_and_update(
+        self,
+        query: Dict[str, Any],
+        update: Dict[str, Any],
+        projection: Optional[Dict[str, Any]] = None,
+        sort: Any = None,
+        upsert: bool = False,
+        return_document: bool = False,
+    ):
+        async with self._lock:
+            candidates = MemoryCursor(list(self._find(query)), None)
+            if sort:
+                candidates.sort(sort)
+            docs = candidates._materialize()
+            if docs:
+                target = next(doc for doc in self._docs if doc["_id"] == docs[0]["_id"])
+                before = _project(target, projection)
+                _apply_update(target, update, inserting=False)
+                return _project(target, projection) if return_document else before
+            if upsert:
+                doc = self._upsert_seed(query)
+                _apply_update(doc, update, inserting=True)
+                self._docs.append(doc)
+                return _project(doc, projection) if return_document else None
+            return None
+
+    async def delete_one(self, query: Dict[str, Any]) -> DeleteResult:
+        async with self._lock:
+            for doc in self._find(query):
+                self._docs.remove(doc)
+                return DeleteResult(1)
+            return DeleteResult(0)
+
+    async def delete_many(self, query: Dict[str, Any]) -> DeleteResult:
+        async with self._lock:
+            docs = list(self._find(query))
+            for doc in docs:
+                self._docs.remove(doc)
+            return DeleteResult(len(docs))
+
+
+class MemoryDatabase:
+    def __init__(self, name: str):
+        self.name = name
+        self._collections: Dict[str, MemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = MemoryCollection(name)
+        return self._collections[name]
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+
+class MemoryClient:
+    def __init__(self):
+        self._databases: Dict[str, MemoryDatabase] = {}
+
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        if name not in self._databases:
+            self._databases[name] = MemoryDatabase(name)
+        return self._databases[name]
+
+    def close(self) -> None:
+        pass
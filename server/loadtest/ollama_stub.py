@@ -0,0 +1,41 @@
+"""Stub Ollama ``/api/generate`` server with configurable latency."""
+import asyncio
+import json
+import random
+from aiohttp import web
+
+
+class OllamaStub:
+    def __init__(self, latency: float = 2.0, jitter: float = 0.5, host: str = "127.0.0.1", port: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.host = host
+        self.port = port
+        self.calls = 0
+        self._runner: web.AppRunner | None = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def _generate(self, request: web.Request) -> web.Response:
+        self.calls += 1
+        payload = await request.json()
+        delay = max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+        await asyncio.sleep(delay)
+        # Answer with an empty object: the extractor treats that as "nothing inferred"
+        return web.json_response({"model": payload.get("model"), "response": json.dumps({}), "done": True})
+
+    async def start(self) -> "OllamaStub":
+        app = web.Application()
+        app.router.add_post("/api/generate", self._generate)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
@@ -0,0 +1,197 @@
+"""End-to-end load test for the extraction API.
+
+Usage (from ``server/``)::
+
+    python -m loadtest.run --sessions 50 --concurrency 8
+    python -m loadtest.run --mix digital_pdf --size medium --llm-latency 5
+    python -m loadtest.run --mongo-uri mongodb://localhost:27017 --ollama-url http://localhost:11434
+
+Each session runs upload -> extract -> page preview -> edit -> export against
+the real FastAPI app in-process. Mongo is replaced by ``MemoryClient`` and
+Ollama by ``OllamaStub`` unless real endpoints are given, so the harness runs
+without network access. PDF parsing and OCR run in worker threads and the
+PDF/Excel process pools, gated by the capacity limiters, so latency growth on
+``/extract`` and ``/page`` under concurrency shows where those pools and slots
+saturate rather than the event loop itself.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List
+
+MIME_TYPES = {
+    ".pdf": "application/pdf",
+    ".csv": "text/csv",
+    ".xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def call(self, name: str, request) -> Any:
+        start = time.perf_counter()
+        try:
+            response = await request
+        except Exception:
+            self.errors[name] += 1
+            raise
+        finally:
+            self.latencies[name].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.errors[name] += 1
+            response.raise_for_status()
+        return response
+
+    def report(self, wall_time: float) -> Dict[str, Any]:
+        endpoints = {}
+        for name, samples in self.latencies.items():
+            endpoints[name] = {
+                "count": len(samples),
+                "errors": self.errors.get(name, 0),
+                "p50_ms": percentile(samples, 50) * 1000,
+                "p95_ms": percentile(samples, 95) * 1000,
+                "p99_ms": percentile(samples, 99) * 1000,
+                "max_ms": max(samples) * 1000,
+                "throughput_rps": len(samples) / wall_time if wall_time else 0.0,
+            }
+        return endpoints
+
+
+async def run_session(client, recorder: Recorder, path: Path) -> None:
+    mime = MIME_TYPES[path.suffix]
+    upload = await recorder.call(
+        "POST /upload", client.post("/upload", files={"file": (path.name, path.read_bytes(), mime)})
+    )
+    file_id = upload.json()["fileId"]
+    await recorder.call("POST /extract", client.post("/extract", json={"fileId": file_id}))
+    if path.suffix == ".pdf":
+        await recorder.call("GET /page", client.get(f"/page/{file_id}/1"))
+    await recorder.call(
+        "POST /edit",
+        client.post("/edit", json={"fileId": file_id, "field": "insured", "value": "Load Test Insured LLC"}),
+    )
+    await recorder.call("GET /export", client.get(f"/export/{file_id}", params={"format": "json"}))
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    from benchmarks.corpus import build_corpus
+    from loadtest.ollama_stub import OllamaStub
+
+    stub = None
+    if not args.ollama_url:
+        stub = await OllamaStub(latency=args.llm_latency, jitter=args.llm_jitter).start()
+    os.environ["OLLAMA_URL"] = args.ollama_url or stub.url
+    if args.mongo_uri:
+        os.environ["MONGO_URI"] = args.mongo_uri
+    os.environ["UPLOADS_DIR"] = str(args.work_dir / "uploads")
+
+    # Settings are read at import time, so the app is only imported once the environment is ready
+    import httpx
+    from app import db
+    from app.main import app
+
+    if not args.mongo_uri:
+        from loadtest.memory_store import MemoryClient
+        db._client = MemoryClient()
+
+    corpus = build_corpus(args.work_dir / "corpus", [args.size])[args.size]
+    files = [corpus[kind] for kind in args.mix]
+
+    recorder = Recorder()
+    failures = 0
+    semaphore = asyncio.Semaphore(args.concurrency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+
+            async def worker(index: int) -> None:
+                nonlocal failures
+                async with semaphore:
+                    try:
+                        await run_session(client, recorder, files[index % len(files)])
+                    except Exception as exc:
+                        failures += 1
+                        if args.verbose:
+                            print(f"session {index} failed: {exc}", file=sys.stderr)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(worker(index) for index in range(args.sessions)))
+            wall_time = time.perf_counter() - start
+
+    if stub:
+        await stub.stop()
+
+    return {
+        "config": {
+            "sessions": args.sessions,
+            "concurrency": args.concurrency,
+            "size": args.size,
+            "mix": args.mix,
+            "llmLatency": None if args.ollama_url else args.llm_latency,
+            "mongo": "external" if args.mongo_uri else "memory",
+        },
+        "wallTimeS": wall_time,
+        "sessionsPerS": (args.sessions - failures) / wall_time if wall_time else 0.0,
+        "failedSessions": failures,
+        "llmCalls": stub.calls if stub else None,
+        "endpoints": recorder.report(wall_time),
+    }
+
+
+def print_report(result: Dict[str, Any]) -> None:
+    print(f"{'endpoint':<14}{'count':>7}{'err':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>8}")
+    for name, stats in result["endpoints"].items():
+        print(
+            f"{name:<14}{stats['count']:>7}{stats['errors']:>5}{stats['p50_ms']:>10.1f}"
+            f"{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}{stats['throughput_rps']:>8.2f}"
+        )
+    print(
+        f"\n{result['config']['sessions']} sessions in {result['wallTimeS']:.1f}s "
+        f"({result['sessionsPerS']:.2f} sessions/s, {result['failedSessions']} failed)"
+    )
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Drive concurrent upload/extract/edit/export sessions")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--size", choices=["small", "medium", "large"], default="small")
+    parser.add_argument("--mix", nargs="+", choices=["digital_pdf", "scanned_pdf", "csv", "xlsx"], default=["digital_pdf", "csv", "xlsx"])
+    parser.add_argument("--llm-latency", type=float, default=2.0, help="Stub Ollama response time in seconds")
+    parser.add_argument("--llm-jitter", type=float, default=0.5)
+    parser.add_argument("--mongo-uri", help="Use a real MongoDB instead of the in-memory store")
+    parser.add_argument("--ollama-url", help="Use a real Ollama instead of the stub")
+    parser.add_argument("--output", type=Path, help="Write the JSON report here")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="docx-load-") as tmp:
+        args.work_dir = Path(tmp)
+        result = asyncio.run(run(args))
+
+    print_report(result)
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2))
+    return 1 if result["failedSessions"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""MongoJobQueue against a real mongod.
+
+Run from ``server/``::
+
+    MONGO_TEST_URI=mongodb://localhost:27017 python -m pytest tests
+
+Tests that touch Mongo use a throwaway database and are skipped when no mongod answers.
+"""
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable
+from uuid import uuid4
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo.errors import ServerSelectionTimeoutError
+from app.workers.mongo_queue import DEAD, DONE, QUEUED, RUNNING, MongoJobQueue
+
+MONGO_URI = os.getenv("MONGO_TEST_URI", "mongodb://localhost:27017")
+LEASE = 0.2
+
+
+def run(test: Callable[[AsyncIOMotorDatabase], Awaitable[None]]) -> None:
+    async def main() -> None:
+        client = AsyncIOMotorClient(MONGO_URI, serverSelectionTimeoutMS=1000)
+        try:
+            await client.admin.command("ping")
+        except ServerSelectionTimeoutError:
+            client.close()
+            pytest.skip(f"no mongod at {MONGO_URI}")
+        db = client[f"queue_test_{uuid4().hex[:12]}"]
+        try:
+            await test(db)
+        finally:
+            await client.drop_database(db.name)
+            client.close()
+
+    asyncio.run(main())
+
+
+def make_queue(db: AsyncIOMotorDatabase, **overrides) -> MongoJobQueue:
+    options = {"lease_seconds": LEASE, "max_attempts": 3, "backoff_seconds": 0.05, **overrides}
+    return MongoJobQueue(db.jobs, files=db.files, **options)
+
+
+def test_claim_takes_oldest_runnable_job_once():
+    async def body(db):
+        queue = make_queue(db)
+        await queue.ensure_indexes()
+        first = await queue.enqueue("file-1")
+        second = await queue.enqueue("file-2")
+        later = await queue.enqueue("file-3")
+        await db.jobs.update_one(
+            {"jobId": later["jobId"]}, {"$set": {"availableAt": datetime.utcnow() + timedelta(hours=1)}}
+        )
+
+        claimed = await queue.claim("worker-a")
+        assert claimed["jobId"] == first["jobId"]
+        assert claimed["status"] == RUNNING
+        assert claimed["workerId"] == "worker-a"
+        assert claimed["attempts"] == 1
+        assert (await queue.claim("worker-b"))["jobId"] == second["jobId"]
+        # The third job is not available yet and the others are leased
+        assert await queue.claim("worker-c") is None
+
+        assert await queue.complete(first["jobId"], "worker-a", {"fieldsFound": 4})
+        done = await queue.get(first["jobId"])
+        assert done["status"] == DONE
+        assert done["result"] == {"fieldsFound": 4}
+
+    run(body)
+
+
+def test_concurrent_claims_never_share_a_job():
+    async def body(db):
+        queue = make_queue(db)
+        for index in range(10):
+            await queue.enqueue(f"file-{index}")
+        claims = await asyncio.gather(*(queue.claim(f"worker-{index}") for index in range(15)))
+        job_ids = [job["jobId"] for job in claims if job is not None]
+        assert len(job_ids) == 10
+        assert len(set(job_ids)) == 10
+
+    run(body)
+
+
+def test_expired_lease_is_reclaimed_and_old_owner_loses_it():
+    async def body(db):
+        queue = make_queue(db)
+        job = await queue.enqueue("file-1")
+        await queue.claim("worker-a")
+        assert await queue.heartbeat(job["jobId"], "worker-a")
+        assert await queue.claim("worker-b") is None
+
+        await asyncio.sleep(LEASE * 1.5)
+        reclaimed = await queue.claim("worker-b")
+        assert reclaimed["jobId"] == job["jobId"]
+        assert reclaimed["workerId"] == "worker-b"
+        assert reclaimed["attempts"] == 2
+        assert not await queue.heartbeat(job["jobId"], "worker-a")
+        assert not await queue.complete(job["jobId"], "worker-a")
+        assert await queue.complete(job["jobId"], "worker-b")
+
+    run(body)
+
+
+def test_failure_is_retried_after_backoff():
+    async def body(db):
+        queue = make_queue(db)
+        job = await queue.enqueue("file-1")
+        claimed = await queue.claim("worker-a")
+        assert await queue.fail(claimed, "worker-a", "Ollama timed out") == QUEUED
+
+        stored = await queue.get(job["jobId"])
+        assert stored["status"] == QUEUED
+        assert stored["lastError"] == "Ollama timed out"
+        assert "workerId" not in stored
+        assert stored["availableAt"] > datetime.utcnow() - timedelta(seconds=1)
+
+        await asyncio.sleep(queue.backoff_seconds * 2)
+        retried = await queue.claim("worker-b")
+        assert retried["jobId"] == job["jobId"]
+        assert retried["attempts"] == 2
+
+    run(body)
+
+
+def test_backoff_grows_and_is_capped():
+    # Pure arithmetic: the client is never used, so this runs without a mongod
+    client = AsyncIOMotorClient(MONGO_URI)
+    try:
+        queue = make_queue(client["unused"], backoff_seconds=10, max_backoff_seconds=60)
+        assert 5 <= queue.backoff(1) <= 10
+        assert 20 <= queue.backoff(3) <= 40
+        assert 30 <= queue.backoff(10) <= 60
+    finally:
+        client.close()
+
+
+def test_last_failure_moves_job_to_dead():
+    async def body(db):
+        queue = make_queue(db, max_attempts=2)
+        job = await queue.enqueue("file-1")
+        for attempt in range(2):
+            claimed = await queue.claim("worker-a")
+            outcome = await queue.fail(claimed, "worker-a", f"boom {attempt}")
+            await asyncio.sleep(queue.backoff_seconds * 2)
+        assert outcome == DEAD
+        stored = await queue.get(job["jobId"])
+        assert stored["status"] == DEAD
+        assert stored["lastError"] == "boom 1"
+        assert await queue.claim("worker-a") is None
+
+    run(body)
+
+
+def test_job_whose_lease_keeps_expiring_is_dead_lettered_and_file_failed():
+    async def body(db):
+        queue = make_queue(db, max_attempts=1)
+        await db.files.insert_many(
+            [{"fileId": "stuck", "status": "extracting"}, {"fileId": "done", "status": "extracted"}]
+        )
+        stuck = await queue.enqueue("stuck")
+        done = await queue.enqueue("done", kind="complete")
+        assert (await queue.claim("worker-a"))["jobId"] == stuck["jobId"]
+        assert (await queue.claim("worker-a"))["jobId"] == done["jobId"]
+
+        # Both workers crash; neither job may run a second time
+        await asyncio.sleep(LEASE * 1.5)
+        assert await queue.claim("worker-b") is None
+
+        for job in (stuck, done):
+            stored = await queue.get(job["jobId"])
+            assert stored["status"] == DEAD
+            assert stored["lastError"] == "Lease expired too many times"
+        assert (await db.files.find_one({"fileId": "stuck"}))["status"] == "failed"
+        # A file that already has a result keeps it
+        assert (await db.files.find_one({"fileId": "done"}))["status"] == "extracted"
+
+    run(body)